@@ -1,18 +1,26 @@
 """Module which contains the MailContainer class."""
 
 import copy
+import hashlib
+import re
 import sys
+from collections import deque
 from datetime import datetime
-from typing import List, Dict
-from functools import partial
+from typing import List, Dict, Iterator, Tuple
 from pprint import pprint
 
-from src.plugins.interfaces import IDataContainer, IRequiresPlugins, IRequiresRepository
+from src.plugins.interfaces import IDataContainer, IRequiresPlugins, IRequiresRepository, IMergeable, \
+                                  IFlushable
+from src.serialization.interfaces import ISerializable
+from src.containers.fragment import Fragment
+from src.containers.correlation import DisjointSet
 from src.repository.interfaces import IRepository
 from src import constants
 from src.plugins.bases.plugin_base import RegexFlags
 from src.plugins.bases.plugin_processor import ProcessorData, ProcessorAction
 from src.repository.misc import SearchScope
+from src.repository.lookup import LookupTable
+from src.repository.bulk import BulkWriter
 from src.plugins.bases.mail_edge_case_processor import MailEdgeCaseProcessorData
 from src.expression.builder import ExpressionBuilder, ExpressionField, Comparator
 from src.config import Config
@@ -22,7 +30,7 @@ class AlreadyInRepository(Exception):
     pass
 
 
-class MailContainer(IDataContainer, IRequiresPlugins, IRequiresRepository):
+class MailContainer(IDataContainer, IRequiresPlugins, IRequiresRepository, IMergeable, IFlushable, ISerializable):
     """
     Container which aggregates and stores mail objects.
 
@@ -30,14 +38,52 @@ class MailContainer(IDataContainer, IRequiresPlugins, IRequiresRepository):
     fragment:   a fragment is a part of a mail-object, this fragment is then merged with
                 other fragments into one mail-object. Eg. such a fragment could be all
                 data of a mail from phd-mxin.
+
+    Streaming:
+    By default all fragments are kept in memory until build_final. If 'streaming'
+    is enabled, a mail is aggregated and stored as soon as its lifecycle finished
+    (its queue ids on phd-mxin and phd-imap were removed by qmgr, rejected mails
+    immediately) and 'streaming_window' further loglines were added, which may
+    still contain late fragments (eg. spamd or sieve results). A flush aggregates
+    the mails which finished before the previous flush.
+
+    Unfinished mails:
+    If a 'store_path' is configured, build_final only stores the finished mails
+    and keeps the fragments of unfinished mails, which are then serialized by the
+    parser and restored in the next run. This way mails which span two runs are
+    aggregated in memory instead of via the incomplete mails in the repository.
+    Fragments which are still unfinished after the next run are stored as before.
     """
 
+    # default number of loglines to wait for late fragments in streaming mode
+    __defaultStreamingWindow = 10000
+    # default number of mails which are stored at once
+    __defaultWriteBatchSize = 1000
+
+    # the fragments of a map are correlated by this key (see __correlate)
+    __mapKeys = {
+        'map_qid_mxin': constants.PHD_MXIN_QID,
+        'map_qid_imap': constants.PHD_IMAP_QID,
+        'map_msgid': constants.MESSAGEID,
+        'map_pickup': constants.PHD_IMAP_QID
+    }
+    # the queue id of a mail which is locally forwarded (see mail-edge-cases.d)
+    __forwardedRegex = re.compile('forwarded as (?P<' + constants.PHD_IMAP_QID + r'>[^$]+)')
+
+    # version of the format of the stored mails (see __migrate_stored_mails)
+    # 1: rejected mails have a content hash
+    __storedDataVersion = 1
+
+    # the stored mails are looked up by these keys while aggregating (see __prefetch)
+    __lookupKeys = [constants.PHD_MXIN_QID, constants.PHD_IMAP_QID, constants.MESSAGEID, constants.CONTENTHASH]
+
     # create following indexes in the repository:
     __fieldsToIndex = [
         constants.PHD_MXIN_QID,
         constants.PHD_IMAP_QID,
         constants.PHD_MXIN_TIME,
         constants.PHD_IMAP_TIME,
+        constants.CONTENTHASH,
         constants.MESSAGEID,
         'sender',
         'recipient',
@@ -60,10 +106,38 @@ class MailContainer(IDataContainer, IRequiresPlugins, IRequiresRepository):
 
         self._pluginManager = None
         self._repository = None
+        # lookup table of the stored mails while aggregating
+        self.__lookup = None
+        self.__writer = None
+        self.__migrated = False
 
         # metadata
         self.__build_final_metadata = {}
 
+        # streaming
+        self.__streaming = Config().get('streaming') is True
+        self.__keepUnfinished = Config().get('store_path') is not None
+        # the lifecycle of the mails (see __mark_removed) is needed in both cases
+        self.__trackLifecycle = self.__streaming or self.__keepUnfinished
+        # map name -> ids of the fragments restored from the last run
+        self.__restoredIds = {}
+
+        self.__streamingWindow = Config().get('streaming_window')
+        if not isinstance(self.__streamingWindow, int) or self.__streamingWindow < 0:
+            self.__streamingWindow = self.__defaultStreamingWindow
+
+        # finished mails are aggregated every 'interval' loglines
+        self.__streamingInterval = max(1, self.__streamingWindow // 10)
+        self.__fragmentCounter = 0
+        # fragment counter at the time of the last flush
+        self.__flushedAt = 0
+        # (fragment counter, key, queue id) in order of removal
+        self.__removedQueue = deque()
+        # key -> queue id -> fragment counter at the time of removal
+        self.__removedAt = {constants.PHD_MXIN_QID: {}, constants.PHD_IMAP_QID: {}}
+        # imap queue id -> mxin queue id, the mail was passed from phd-mxin to phd-imap
+        self.__mxinOfImap = {}
+
     @property
     def subscribedFolder(self) -> str:
         """Return the folder name from which we want the plugin data."""
@@ -75,6 +149,12 @@ class MailContainer(IDataContainer, IRequiresPlugins, IRequiresRepository):
     def set_repository(self, repository: IRepository) -> None:
         self._repository = repository
 
+        batchSize = Config().get('write_batch_size')
+        if not isinstance(batchSize, int) or batchSize < 1:
+            batchSize = self.__defaultWriteBatchSize
+
+        self.__writer = BulkWriter(repository, batchSize)
+
     @staticmethod
     def _merge_data(target: dict, origin: dict) -> None:
         """Generic merge method."""
@@ -151,12 +231,13 @@ class MailContainer(IDataContainer, IRequiresPlugins, IRequiresRepository):
         else:
             target[id][constants.LOGLINES].append(logline)
 
-    def add_fragment(self, data: dict) -> None:
+    def add_fragment(self, data: Fragment) -> None:
         """Add data to the container."""
 
-        logline = data['raw_logline']
+        logline = data.raw_logline
+        pregexdata = data.pregexdata
 
-        for hasData, flags, d in data['data']:
+        for hasData, flags, d in data.data:
             if not hasData:
                 continue
 
@@ -164,7 +245,20 @@ class MailContainer(IDataContainer, IRequiresPlugins, IRequiresRepository):
             imap_qid = d.get(constants.PHD_IMAP_QID)
             messageid = d.get(constants.MESSAGEID)
 
-            pregexdata = data['pregexdata']
+            if RegexFlags.REMOVED in flags:
+                # this logline only marks the end of the lifecycle
+                # of a queue id, it does not contain any mail data
+                if self.__trackLifecycle:
+                    if mxin_qid is not None:
+                        self.__mark_removed(constants.PHD_MXIN_QID, mxin_qid)
+                    elif imap_qid is not None:
+                        self.__mark_removed(constants.PHD_IMAP_QID, imap_qid)
+
+                continue
+
+            if self.__trackLifecycle and mxin_qid is not None and imap_qid is not None:
+                self.__mxinOfImap[imap_qid] = mxin_qid
+
             hostname = pregexdata.get('hostname')
 
             # if the STORETIME flag is present, we store the date and time
@@ -210,6 +304,186 @@ class MailContainer(IDataContainer, IRequiresPlugins, IRequiresRepository):
             elif messageid is not None:
                 self._aggregate_fragment(messageid, self._map_msgid, d, logline)
 
+        if self.__trackLifecycle:
+            self.__fragmentCounter += 1
+
+            if self.__streaming and self.__fragmentCounter % self.__streamingInterval == 0:
+                self.__aggregate_finished_mails(self.__fragmentCounter - self.__streamingWindow)
+
+    def flush(self) -> None:
+        """Aggregate and store the mails which finished before the last flush (streaming)."""
+        self.__aggregate_finished_mails(self.__flushedAt)
+        self.__flushedAt = self.__fragmentCounter
+
+    def __mark_removed(self, key: str, qid: str) -> None:
+        """Remember that a queue id (PHD_MXIN_QID or PHD_IMAP_QID) was removed by qmgr."""
+        self.__removedAt[key][qid] = self.__fragmentCounter
+        self.__removedQueue.append((self.__fragmentCounter, key, qid))
+
+    def __is_finished(self, mxin_qid: str, threshold: int) -> bool:
+        """
+        Check whether the lifecycle of a mail from phd-mxin finished before 'threshold'.
+
+        This is the case if its queue id and the queue ids of the
+        mail on phd-imap were removed before 'threshold'.
+        """
+        frag = self._map_qid_mxin.get(mxin_qid)
+        if frag is None:
+            # already aggregated
+            return False
+
+        removed = self.__removedAt[constants.PHD_MXIN_QID].get(mxin_qid)
+        if removed is None or removed > threshold:
+            return False
+
+        imap_qids = frag.get(constants.PHD_IMAP_QID)
+        if imap_qids is None:
+            return True
+
+        if not isinstance(imap_qids, list):
+            imap_qids = [imap_qids]
+
+        for imap_qid in imap_qids:
+            removed = self.__removedAt[constants.PHD_IMAP_QID].get(imap_qid)
+            if removed is None or removed > threshold:
+                return False
+
+        return True
+
+    def __aggregate_finished_mails(self, threshold: int) -> None:
+        """Aggregate and store all mails which finished before the fragment counter was 'threshold'."""
+        mxinFrags = {}
+        imapFrags = {}
+
+        while len(self.__removedQueue) > 0 and self.__removedQueue[0][0] <= threshold:
+            counter, key, qid = self.__removedQueue.popleft()
+
+            if key == constants.PHD_IMAP_QID:
+                mxin_qid = self.__mxinOfImap.get(qid)
+
+                if mxin_qid in mxinFrags:
+                    # will be aggregated together with the mail from phd-mxin
+                    continue
+
+                if mxin_qid is None or mxin_qid not in self._map_qid_mxin:
+                    # the mail did not pass phd-mxin (eg. sent by a user)
+                    # or the mail from phd-mxin was already aggregated
+                    self.__removedAt[key].pop(qid, None)
+                    self.__mxinOfImap.pop(qid, None)
+
+                    if qid in self._map_qid_imap:
+                        imapFrags[qid] = self._map_qid_imap.pop(qid)
+
+                    continue
+            else:
+                mxin_qid = qid
+
+                if mxin_qid not in mxinFrags and mxin_qid not in self._map_qid_mxin:
+                    # no fragment left (already aggregated or the lifecycle
+                    # started before this run), nothing will clean it up later
+                    self.__removedAt[key].pop(mxin_qid, None)
+                    continue
+
+            if mxin_qid not in mxinFrags and self.__is_finished(mxin_qid, threshold):
+                mxinFrags[mxin_qid] = self._map_qid_mxin.pop(mxin_qid)
+
+        for mxin_qid, frag in mxinFrags.items():
+            del self.__removedAt[constants.PHD_MXIN_QID][mxin_qid]
+
+            imap_qids = frag.get(constants.PHD_IMAP_QID)
+            if imap_qids is not None and not isinstance(imap_qids, list):
+                imap_qids = [imap_qids]
+
+            for imap_qid in imap_qids or []:
+                self.__removedAt[constants.PHD_IMAP_QID].pop(imap_qid, None)
+                self.__mxinOfImap.pop(imap_qid, None)
+
+        # rejected mails do not have a lifecycle
+        noqueue = self._map_qid_mxin.pop(constants.NOQUEUE, None)
+        if noqueue is not None:
+            mxinFrags[constants.NOQUEUE] = noqueue
+
+        self.__prefetch([mxinFrags, imapFrags])
+
+        self.__aggregate_mails(
+            [mxinFrags, self._map_qid_imap, self._map_msgid],
+            [constants.PHD_MXIN_QID, constants.PHD_IMAP_QID, constants.MESSAGEID]
+        )
+
+        self.__aggregate_mails(
+            [imapFrags, self._map_msgid],
+            [constants.PHD_IMAP_QID, constants.MESSAGEID]
+        )
+
+        # the merged messageid fragments are not needed anymore
+        for messageid in [k for k, v in self.__build_final_metadata.items() if v is True]:
+            self._map_msgid.pop(messageid, None)
+            del self.__build_final_metadata[messageid]
+
+        self.__writer.flush()
+        self.__lookup = None
+
+    def get_mergeable_data(self) -> object:
+        """Return all fragments which were not yet aggregated and the known lifecycles."""
+        data = self.__get_maps()
+        data['removed'] = {key: list(removed.keys()) for key, removed in self.__removedAt.items()}
+        data['mxin_of_imap'] = self.__mxinOfImap
+
+        return data
+
+    def get_serializable_data(self) -> object:
+        """Return the fragments of the unfinished mails (see build_final)."""
+        return self.get_mergeable_data()
+
+    def restore_serialized_data(self, data: object) -> None:
+        """Restore the fragments of the unfinished mails of the last run."""
+        self.merge(data)
+
+        self.__restoredIds = {name: set(fragments.keys()) for name, fragments in self.__get_maps().items()}
+
+    def _merge_fragments(self, target: dict, id: str, frag: object) -> None:
+        """Merge one fragment (or list of NOQUEUE fragments) into a fragment map."""
+        if id == constants.NOQUEUE:
+            if not isinstance(target.get(id), list):
+                target[id] = []
+
+            target[id].extend(frag)
+        elif target.get(id) is None:
+            target[id] = frag
+        else:
+            self._merge_data(target[id], frag)
+
+    def merge(self, data: dict) -> None:
+        """Merge the fragments collected by another MailContainer into self."""
+        for id, frag in data['map_qid_mxin'].items():
+            self._merge_fragments(self._map_qid_mxin, id, frag)
+
+        for id, frag in data['map_msgid'].items():
+            self._merge_fragments(self._map_msgid, id, frag)
+
+        # the other container did not know which imap queue ids
+        # belong to a pickup, so we have to resolve this here
+        for id, frag in data['map_pickup'].items():
+            prev_frag = self._map_qid_imap.get(id)
+            if prev_frag is not None:
+                self._merge_fragments(self._map_pickup, id, prev_frag)
+                del self._map_qid_imap[id]
+
+            self._merge_fragments(self._map_pickup, id, frag)
+
+        for id, frag in data['map_qid_imap'].items():
+            if self._map_pickup.get(id) is not None:
+                self._merge_fragments(self._map_pickup, id, frag)
+            else:
+                self._merge_fragments(self._map_qid_imap, id, frag)
+
+        if self.__trackLifecycle:
+            self.__mxinOfImap.update(data.get('mxin_of_imap', {}))
+
+            for key, qids in data.get('removed', {}).items():
+                for qid in qids:
+                    self.__mark_removed(key, qid)
+
     def __processing_porocessors(self, mail: dict, responsibility: str) -> ProcessorAction:
         if self._pluginManager is not None:
             chain = self._pluginManager.get_chain_with_responsibility(responsibility)
@@ -226,6 +500,49 @@ class MailContainer(IDataContainer, IRequiresPlugins, IRequiresRepository):
         """Apply postprocessing plugins to a mail-object."""
         return self.__processing_porocessors(mail, 'postprocessors')
 
+    @staticmethod
+    def _content_hash(mail: dict) -> str:
+        """Return the sha1 of the loglines of a (rejected) mail."""
+        loglines = mail.get(constants.LOGLINES) or []
+        return hashlib.sha1(''.join(sorted(loglines)).encode('utf-8')).hexdigest()
+
+    @classmethod
+    def _make_identifier(cls, mail: dict) -> str:
+        """
+        Return the deterministic identifier of a mail derived from its correlation key.
+
+        'mxin:<qid>:<first seen>' or 'imap:<qid>:<first seen>' for queued mails,
+        'msgid:<messageid>' for mails which only have a messageid and
+        'noqueue:<content hash>' for rejected mails.
+        Return None if the mail has none of those keys.
+        """
+        def first(value: object) -> object:
+            if isinstance(value, list):
+                return min(value, key=str) if len(value) > 0 else None
+
+            return value
+
+        def first_seen(key: str) -> str:
+            dt = first(mail.get(key))
+            return dt.isoformat() if isinstance(dt, datetime) else str(dt or '')
+
+        mxin_qid = first(mail.get(constants.PHD_MXIN_QID))
+
+        if mxin_qid == constants.NOQUEUE:
+            return 'noqueue:' + (mail.get(constants.CONTENTHASH) or cls._content_hash(mail))
+        elif mxin_qid is not None:
+            return 'mxin:%s:%s' % (mxin_qid, first_seen(constants.PHD_MXIN_TIME))
+
+        imap_qid = first(mail.get(constants.PHD_IMAP_QID))
+        if imap_qid is not None:
+            return 'imap:%s:%s' % (imap_qid, first_seen(constants.PHD_IMAP_TIME))
+
+        messageid = first(mail.get(constants.MESSAGEID))
+        if messageid is not None:
+            return 'msgid:%s' % messageid
+
+        return None
+
     def __process_aggregated_mail(self, mail: dict) -> None:
         isIncomplete = True
 
@@ -251,11 +568,75 @@ class MailContainer(IDataContainer, IRequiresPlugins, IRequiresRepository):
             sys.stdout.write('\rAggregated %d mails' % self.__build_final_metadata['aggregatedmails'])
             sys.stdout.flush()
 
-        self._repository.insert_or_update(mail, scope)
+        identifier = self._make_identifier(mail)
+        if identifier is not None:
+            self._repository.set_identifier(mail, identifier)
+
+        self.__writer.write(mail, scope)
+
+        if self.__lookup is not None:
+            self.__lookup.add(mail, scope)
+
+    def __migrate_stored_mails(self) -> None:
+        """
+        Migrate the mails stored by an older version once.
+
+        Rejected mails are only detected as already stored by their content hash,
+        therefore it is added to the rejected mails which were stored without it.
+        """
+        if self.__migrated:
+            return
+
+        self.__migrated = True
+
+        if self._repository.get_version_of_stored_data() >= self.__storedDataVersion:
+            return
+
+        builder = ExpressionBuilder()
+        builder.add_field(ExpressionField(constants.PHD_MXIN_QID, constants.NOQUEUE, Comparator.equal))
+        builder.add_field(ExpressionField(constants.CONTENTHASH, str(None), Comparator.equal))
+
+        failedObjects = self.__writer.failedObjects
+
+        for scope in (SearchScope.COMPLETE, SearchScope.INCOMPLETE):
+            for mail in self._repository.find(builder.expression, scope):
+                mail[constants.CONTENTHASH] = self._content_hash(mail)
+                self.__writer.write(mail, scope)
+
+        self.__writer.flush()
+
+        # otherwise try again in the next run
+        if self.__writer.failedObjects == failedObjects:
+            self._repository.save_version_of_stored_data(self.__storedDataVersion)
+
+    def __prefetch(self, fragmentMaps: List[Dict[str, dict]]) -> None:
+        """Create the lookup table and fetch the stored mails of the fragments with one query per key."""
+        self.__migrate_stored_mails()
+        self.__lookup = LookupTable(self._repository, self.__lookupKeys, self.__writer.flush)
+
+        values = {key: set() for key in self.__lookupKeys}
+
+        for fragments in fragmentMaps:
+            for id, frag in fragments.items():
+                if id == constants.NOQUEUE:
+                    values[constants.CONTENTHASH].update(self._content_hash(f) for f in frag)
+                    continue
+
+                for f in frag if isinstance(frag, list) else [frag]:
+                    for key in self.__lookupKeys:
+                        value = f.get(key)
+
+                        for v in value if isinstance(value, list) else [value]:
+                            if isinstance(v, str) and v != constants.NOQUEUE:
+                                values[key].add(v)
+
+        for key, keyValues in values.items():
+            self.__lookup.prefetch(key, keyValues)
 
     def __aggregate_mails(self,
                           fragmentChain: List[Dict[str, dict]],
-                          keyChain: List[str]) -> None:
+                          keyChain: List[str],
+                          maps: Dict[str, dict] = None) -> None:
         """
         Abstract:
         This method aggregates all fragments with a fragmentChain
@@ -301,8 +682,15 @@ class MailContainer(IDataContainer, IRequiresPlugins, IRequiresRepository):
         fragment = fragments[key]
 
         this fragment is then merged with one fragment in fragments.
+
+        maps:
+        the maps the mail edge case processors work on, by default all
+        fragments of the container (see __get_maps)
         """
 
+        if maps is None:
+            maps = self.__get_maps()
+
         """
         Clojures
         """
@@ -321,8 +709,6 @@ class MailContainer(IDataContainer, IRequiresPlugins, IRequiresRepository):
             builder = ExpressionBuilder()
             builder.add_field(ExpressionField(keyChain[0], str(initialID), Comparator.equal))
 
-            do_query = partial(self._repository.find, builder.expression)
-
             # if we are currently merging the messageid map and we
             # already have merged this messageid we will ignore it
             if keyChain[0] == constants.MESSAGEID and \
@@ -330,28 +716,30 @@ class MailContainer(IDataContainer, IRequiresPlugins, IRequiresRepository):
                 raise AlreadyInRepository()
 
             if initialID == constants.NOQUEUE:
-                builder2 = ExpressionBuilder()
-
-                for k, v in frag.items():
-                    builder2.add_field(ExpressionField(k, v, Comparator.equal))
+                contentHash = self._content_hash(frag)
 
-                if len(self._repository.find(builder2.expression, SearchScope.ALL)) > 0:
+                if len(self.__lookup.find(constants.CONTENTHASH, contentHash, SearchScope.ALL)) > 0:
                     raise AlreadyInRepository()
 
                 target = copy.deepcopy(frag)
+                target[constants.CONTENTHASH] = contentHash
             else:
-                try:
-                    target = next(do_query(SearchScope.INCOMPLETE))
+                stored = self.__lookup.find(keyChain[0], initialID, SearchScope.INCOMPLETE)
+
+                if len(stored) > 0:
+                    target = stored[0]
                     self._repository.remove_metadata(target)
                     self.__preprocessing(target)
 
                     # remove this data as it may be complete afterwards
                     self._repository.delete(builder.expression, SearchScope.INCOMPLETE)
-                except StopIteration as e:
-                    res = do_query(SearchScope.COMPLETE)
+                    self.__writer.discard(keyChain[0], initialID, SearchScope.INCOMPLETE)
+                    self.__lookup.remove(keyChain[0], initialID, SearchScope.INCOMPLETE)
+                else:
+                    res = self.__lookup.find(keyChain[0], initialID, SearchScope.COMPLETE)
                     if len(res) > 0:
 
-                        res = next(res)
+                        res = res[0]
 
                         for i in range(1, len(keyChain)):
                             try:
@@ -391,18 +779,18 @@ class MailContainer(IDataContainer, IRequiresPlugins, IRequiresRepository):
                             builder = ExpressionBuilder()
                             builder.add_field(ExpressionField(keyChain[index], id, Comparator.equal))
 
-                            do_query = partial(self._repository.find, builder.expression)
-
                             def gather_existing_data(scope: SearchScope):
-                                try:
-                                    data = next(do_query(scope))
+                                stored = self.__lookup.find(keyChain[index], id, scope)
+
+                                if len(stored) > 0:
+                                    data = stored[0]
                                     self._repository.remove_metadata(data)
                                     self.__preprocessing(data)
                                     self._merge_data(target, data)
 
                                     self._repository.delete(builder.expression, scope)
-                                except StopIteration as e:
-                                    pass
+                                    self.__writer.discard(keyChain[index], id, scope)
+                                    self.__lookup.remove(keyChain[index], id, scope)
 
                             gather_existing_data(SearchScope.INCOMPLETE)
                             # gather_existing_data(SearchScope.COMPLETE)
@@ -446,10 +834,10 @@ class MailContainer(IDataContainer, IRequiresPlugins, IRequiresRepository):
             # process all the edge cases
             data = MailEdgeCaseProcessorData(
                 target,
-                self._map_qid_mxin,
-                self._map_qid_imap,
-                self._map_msgid,
-                self._map_pickup,
+                maps['map_qid_mxin'],
+                maps['map_qid_imap'],
+                maps['map_msgid'],
+                maps['map_pickup'],
                 self._merge_data,
                 keyChain[0]
             )
@@ -493,53 +881,165 @@ class MailContainer(IDataContainer, IRequiresPlugins, IRequiresRepository):
         # clear the list of fragments
         fragmentChain[0].clear()
 
-    def build_final(self) -> None:
-        """Aggregate data to mail objects."""
-        self.__build_final_metadata = {}
+    def __get_maps(self) -> Dict[str, dict]:
+        return {
+            'map_qid_mxin': self._map_qid_mxin,
+            'map_qid_imap': self._map_qid_imap,
+            'map_msgid': self._map_msgid,
+            'map_pickup': self._map_pickup
+        }
+
+    def __take_unfinished(self) -> Dict[str, dict]:
+        """Remove and return the fragments which were not restored from the last run."""
+        unfinished = {}
+
+        for name, fragments in self.__get_maps().items():
+            restored = self.__restoredIds.get(name, set())
+
+            unfinished[name] = {id: frag for id, frag in fragments.items()
+                                if id not in restored and id != constants.NOQUEUE}
+
+            for id in unfinished[name]:
+                del fragments[id]
+
+        return unfinished
+
+    def __linked_ids(self, data: dict) -> Iterator[Tuple[str, str]]:
+        """Return the ids (key, value) a fragment or a stored mail refers to."""
+        for key in (constants.PHD_MXIN_QID, constants.PHD_IMAP_QID, constants.MESSAGEID):
+            value = data.get(key)
 
+            for v in value if isinstance(value, list) else [value]:
+                if isinstance(v, str):
+                    yield key, v
+
+        deliverymessage = data.get(constants.DELIVERYMESSAGE)
+
+        for dm in deliverymessage if isinstance(deliverymessage, list) else [deliverymessage]:
+            forwarded = self.__forwardedRegex.search(dm) if isinstance(dm, str) else None
+
+            if forwarded is not None:
+                yield constants.PHD_IMAP_QID, forwarded.group(constants.PHD_IMAP_QID)
+
+    def __correlate(self) -> List[Dict[str, dict]]:
+        """
+        Split the fragments into the groups of fragments which belong to the same mails.
+
+        A disjoint-set over all ids (queue ids, messageids, forwarded and
+        pickup queue ids) is built from the fragments and the stored mails
+        which were prefetched. Fragments which are connected by their ids end
+        up in the same group, fragments of different groups are never merged.
+        Each group has the same maps as the container (see __get_maps).
+        """
+        maps = self.__get_maps()
+        ids = DisjointSet()
+
+        for name, fragments in maps.items():
+            for id, frag in fragments.items():
+                node = (self.__mapKeys[name], id)
+                ids.add(node)
+
+                for f in frag if isinstance(frag, list) else [frag]:
+                    for linked in self.__linked_ids(f):
+                        ids.union(node, linked)
+
+        # stored mails connect the fragments they will be merged with
+        for mail in self.__lookup.objects():
+            linked = list(self.__linked_ids(mail))
+
+            for other in linked[1:]:
+                ids.union(linked[0], other)
+
+        components = {}
+        for name, fragments in maps.items():
+            for id, frag in fragments.items():
+                root = ids.find((self.__mapKeys[name], id))
+                component = components.get(root)
+                if component is None:
+                    component = components[root] = {n: {} for n in maps}
+                component[name][id] = frag
+
+        return list(components.values())
+
+    def __aggregate_component(self, maps: Dict[str, dict]) -> None:
+        """Aggregate the fragments of one group (see __correlate) to mail objects."""
         self.__aggregate_mails(
             [
-                self._map_qid_mxin,
-                self._map_qid_imap,
-                self._map_msgid
+                maps['map_qid_mxin'],
+                maps['map_qid_imap'],
+                maps['map_msgid']
             ],
             [
                 constants.PHD_MXIN_QID,
                 constants.PHD_IMAP_QID,
                 constants.MESSAGEID
-            ]
+            ],
+            maps
         )
 
         self.__aggregate_mails(
             [
-                self._map_qid_imap,
-                self._map_msgid
+                maps['map_qid_imap'],
+                maps['map_msgid']
             ],
             [
                 constants.PHD_IMAP_QID,
                 constants.MESSAGEID
-            ]
+            ],
+            maps
         )
 
         self.__aggregate_mails(
             [
-                self._map_msgid,
+                maps['map_msgid'],
             ],
             [
                 constants.MESSAGEID
-            ]
+            ],
+            maps
         )
 
-        for id, mail in self._map_pickup.items():
-
-            builder = ExpressionBuilder()
-            builder.add_field(ExpressionField(constants.PHD_IMAP_QID, id, Comparator.equal))
-
-            if len(self._repository.find(builder.expression,SearchScope.ALL)) == 0:
+        for id, mail in maps['map_pickup'].items():
+            if len(self.__lookup.find(constants.PHD_IMAP_QID, id, SearchScope.ALL)) == 0:
                 if self.__postprocessing(mail) != ProcessorAction.DELETE:
                     self.__process_aggregated_mail(mail)
 
-        self._map_pickup.clear()
+    def build_final(self) -> None:
+        """Aggregate data to mail objects."""
+        self.__build_final_metadata = {}
+
+        unfinished = {}
+        if self.__keepUnfinished:
+            # store the finished mails and keep the unfinished ones for the next run,
+            # unless they were already kept in the last run (aggregated below)
+            self.__aggregate_finished_mails(self.__fragmentCounter)
+            unfinished = self.__take_unfinished()
+
+        self.__prefetch([self._map_qid_mxin, self._map_qid_imap, self._map_msgid, self._map_pickup])
+
+        for component in self.__correlate():
+            self.__aggregate_component(component)
+
+        for fragments in self.__get_maps().values():
+            fragments.clear()
+        self.__writer.flush()
+        self.__lookup = None
+
+        maps = self.__get_maps()
+        for name, fragments in unfinished.items():
+            maps[name].update(fragments)
+
+        # only the lifecycles of the kept fragments are needed anymore
+        self.__removedQueue.clear()
+        self.__removedAt = {
+            constants.PHD_MXIN_QID: {qid: 0 for qid in self.__removedAt[constants.PHD_MXIN_QID]
+                                     if qid in self._map_qid_mxin},
+            constants.PHD_IMAP_QID: {qid: 0 for qid in self.__removedAt[constants.PHD_IMAP_QID]
+                                     if qid in self._map_qid_imap}
+        }
+        self.__mxinOfImap = {imap_qid: mxin_qid for imap_qid, mxin_qid in self.__mxinOfImap.items()
+                             if mxin_qid in self._map_qid_mxin}
+        self.__restoredIds = {}
 
         # create indexes in repository
         self._repository.create_indexes(self.__fieldsToIndex)
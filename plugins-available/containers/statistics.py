@@ -2,10 +2,11 @@
 
 
 from src.exceptions import MultipleDataSetsUnknown
-from src.plugins.interfaces import IDataContainer
+from src.plugins.interfaces import IDataContainer, IMergeable
+from src.containers.fragment import Fragment
 
 
-class Statistics(IDataContainer):
+class Statistics(IDataContainer, IMergeable):
     """Container which composes and holds the statistics."""
 
     def __init__(self):
@@ -21,12 +22,12 @@ class Statistics(IDataContainer):
     def subscribedFolder(self) -> str:
         return "statistics"
 
-    def add_fragment(self, data: dict) -> None:
+    def add_fragment(self, data: Fragment) -> None:
         """Add more data to the statistic."""
         lineHasData = False
         setHasData = True
 
-        for hasData, flags, d in data['data']:
+        for hasData, flags, d in data.data:
             if not hasData:
                 if len(d) > 1:
                     raise MultipleDataSetsUnknown(self.__class__.__name__)
@@ -84,15 +85,33 @@ class Statistics(IDataContainer):
 
                     currLayer = currLayer[subname]
 
-        if len(data) > 0:
-            self._data['total_relevant'] += 1
+        self._data['total_relevant'] += 1
 
-        if (not lineHasData or not setHasData) and len(data) > 0:
+        if not lineHasData or not setHasData:
             self._data['total_unknown'] += 1
 
         self._data['total'] += 1
         self._data['total_irrelevant'] = self._data['total'] - self._data['total_relevant']
 
+    def get_mergeable_data(self) -> object:
+        """Return the statistics collected so far."""
+        return self._data
+
+    def merge(self, data: dict) -> None:
+        """Add the statistics collected by another Statistics container."""
+        def merge_layer(target: dict, origin: dict) -> None:
+            for key, value in origin.items():
+                if isinstance(value, dict):
+                    if not isinstance(target.get(key), dict):
+                        target[key] = {}
+
+                    merge_layer(target[key], value)
+                else:
+                    target[key] = target.get(key, 0) + value
+
+        merge_layer(self._data, data)
+        self._data['total_irrelevant'] = self._data['total'] - self._data['total_relevant']
+
     def build_final(self) -> None:
         """Does nothing ATM, needed for interface."""
         pass
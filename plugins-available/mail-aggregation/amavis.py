@@ -4,6 +4,7 @@ import re
 
 from src import constants
 from src.plugins.bases.simple_plugin import SimplePlugin
+from src.plugins.bases.plugin_base import RegexFlags
 
 
 class Amavis(SimplePlugin):
@@ -11,6 +12,7 @@ class Amavis(SimplePlugin):
 
     def _define_subscription_regex(self):
         self._subscriptionRegex = re.compile(' amavis\[')
+        self._subscribedServices = ['amavis']
 
     def _define_data_regex(self):
         self._dataRegex = [
@@ -26,16 +28,17 @@ class Amavis(SimplePlugin):
 
             # NOT Passed
 
-            re.compile(r'''\)\s(?P<virusresult>[^\{]*){
-                           (?P<virusaction>[^\}]*).+?\]\s<
-                           (?P<sender>[^>]*)>\s->\s<
-                           (?P<recipient>[^>]*)>.+?Queue-ID:\s
-                           (?P<''' + constants.PHD_MXIN_QID + r'''>[^,]*),\sMessage-ID:\s<
-                           (?P<''' + constants.MESSAGEID + r'''>[^>]*)''', re.X),
+            (re.compile(r'''\)\s(?P<virusresult>[^\{]*){
+                            (?P<virusaction>[^\}]*).+?\]\s<
+                            (?P<sender>[^>]*)>\s->\s<
+                            (?P<recipient>[^>]*)>.+?Queue-ID:\s
+                            (?P<''' + constants.PHD_MXIN_QID + r'''>[^,]*),\sMessage-ID:\s<
+                            (?P<''' + constants.MESSAGEID + r'''>[^>]*)''', re.X), (RegexFlags.FALLBACK,)),
 
             # Truncated line (eg. when the lines contains a huge amount of recipients)
 
-            re.compile(r'''Queue-ID:\s(?P<''' + constants.PHD_MXIN_QID + r'''>[^,]*),\s
-                           Message-ID:\s<(?P<''' + constants.MESSAGEID + r'''>[^>]*)?(.+?
-                           queued_as:\s(?P<''' + constants.PHD_IMAP_QID + r'''>[^,]*))''', re.X)
+            (re.compile(r'''Queue-ID:\s(?P<''' + constants.PHD_MXIN_QID + r'''>[^,]*),\s
+                            Message-ID:\s<(?P<''' + constants.MESSAGEID + r'''>[^>]*)?(.+?
+                            queued_as:\s(?P<''' + constants.PHD_IMAP_QID + r'''>[^,]*))''', re.X),
+             (RegexFlags.FALLBACK,))
         ]
@@ -11,6 +11,7 @@ class Cleanup(SimplePlugin):
 
     def _define_subscription_regex(self):
         self._subscriptionRegex = re.compile(' postfix\/cleanup\[')
+        self._subscribedServices = ['postfix/cleanup']
 
     def _define_data_regex(self):
         self._dataRegex = [
@@ -11,6 +11,7 @@ class Delivery(SimplePlugin):
 
     def _define_subscription_regex(self):
         self._subscriptionRegex = re.compile(' postfix\/(smtp|local|pipe)\[')
+        self._subscribedServices = ['postfix/smtp', 'postfix/local', 'postfix/pipe']
 
     def _define_data_regex(self):
         self._dataRegex = [
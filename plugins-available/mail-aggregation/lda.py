@@ -11,6 +11,7 @@ class Lda(SimplePlugin):
 
     def _define_subscription_regex(self):
         self._subscriptionRegex = re.compile('\sdovecot: lda\(')
+        self._subscribedServices = ['dovecot']
 
     def _define_data_regex(self):
         self._dataRegex = [
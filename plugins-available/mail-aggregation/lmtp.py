@@ -4,6 +4,7 @@ import re
 
 from src import constants
 from src.plugins.bases.simple_plugin import SimplePlugin
+from src.plugins.bases.plugin_base import RegexFlags
 
 
 class Lmtp(SimplePlugin):
@@ -11,6 +12,7 @@ class Lmtp(SimplePlugin):
 
     def _define_subscription_regex(self):
         self._subscriptionRegex = re.compile(' postfix\/lmtp\[')
+        self._subscribedServices = ['postfix/lmtp']
 
     def _define_data_regex(self):
         self._dataRegex = [
@@ -22,9 +24,9 @@ class Lmtp(SimplePlugin):
                                 (?P<''' + constants.PHD_IMAP_QID + r'''>[^\)]*)''', re.X),
 
             # status = NOT sent
-            re.compile(
+            (re.compile(
                 r''':\s(?P<''' + constants.HOSTNAME_QID + r'''>[^:]*):\s
                     to=<(?P<recipient>[^>]*).+?
                     status=(?P<lmtpstatus>[^\s]*)\s
-                    \((?P<lmtpmsg>[^\)]*)''', re.X)
+                    \((?P<lmtpmsg>[^\)]*)''', re.X), (RegexFlags.FALLBACK,))
         ]
@@ -13,6 +13,7 @@ class Pickup(SimplePlugin):
 
     def _define_subscription_regex(self):
         self._subscriptionRegex = re.compile(' postfix\/pickup\[')
+        self._subscribedServices = ['postfix/pickup']
 
     def _define_data_regex(self):
         self._dataRegex = [
@@ -21,3 +22,4 @@ class Pickup(SimplePlugin):
                             from=<(?P<''' + constants.USERNAME + r'''>[^>]+)''', re.X),
              (RegexFlags.PICKUP,))
         ]
+        self._dataTypes = {constants.UID: int}
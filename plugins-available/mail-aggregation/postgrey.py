@@ -15,6 +15,7 @@ class Postgrey(SimplePlugin):
 
     def _define_subscription_regex(self):
         self._subscriptionRegex = re.compile('\spostgrey\[')
+        self._subscribedServices = ['postgrey']
 
     def _define_data_regex(self):
         self._dataRegex = [
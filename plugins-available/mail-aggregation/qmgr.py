@@ -4,6 +4,7 @@ import re
 
 from src import constants
 from src.plugins.bases.simple_plugin import SimplePlugin
+from src.plugins.bases.plugin_base import RegexFlags
 
 
 class Qmgr(SimplePlugin):
@@ -11,10 +12,15 @@ class Qmgr(SimplePlugin):
 
     def _define_subscription_regex(self):
         self._subscriptionRegex = re.compile(' postfix\/qmgr\[')
+        self._subscribedServices = ['postfix/qmgr']
 
     def _define_data_regex(self):
         self._dataRegex = [
             re.compile(r''':\s(?P<''' + constants.HOSTNAME_QID + r'''>[^:]*):\s
                             from=<(?P<sender>[^>]*)>,\s
-                            size=(?P<size>[^,]*)''', re.X)
+                            size=(?P<size>[^,]*)''', re.X),
+            # the mail left the queue (delivered, bounced or deleted)
+            (re.compile(r''':\s(?P<''' + constants.HOSTNAME_QID + r'''>[^:]*):\sremoved\s*$'''),
+             (RegexFlags.REMOVED,))
         ]
+        self._dataTypes = {'size': int}
@@ -13,6 +13,7 @@ class Smtpd(SimplePlugin):
 
     def _define_subscription_regex(self):
         self._subscriptionRegex = re.compile(' postfix\/smtpd')
+        self._subscribedServices = ['postfix/smtpd']
 
     def _define_data_regex(self):
         self._dataRegex = [
@@ -27,7 +28,7 @@ class Smtpd(SimplePlugin):
 
             (re.compile(r''':\s(?P<''' + constants.HOSTNAME_QID + r'''>[^:]*):
                             \sclient=(?P<connectclient>[^\]]+?)\[(?P<connectip>[^\]]+?)\]''',
-                        re.X), (RegexFlags.STORETIME,)),
+                        re.X), (RegexFlags.STORETIME, RegexFlags.FALLBACK)),
 
             # reject RCPT and VRFY
             (re.compile(r''':\s(?P<''' + constants.HOSTNAME_QID + r'''>[^:]*):\s
@@ -45,7 +46,7 @@ class Smtpd(SimplePlugin):
                        (?P<rejectstage>[^\s]*)\sfrom\s
                        (?P<connectclient>[^\[]*)\[(?P<connectip>[^\]]*)\]:\s
                        (?P<statuscode>[^\s]*)\s[^\s]*\s
-                       (?P<rejectreason>[^;]*)''', re.X), (RegexFlags.STORETIME,)),
+                       (?P<rejectreason>[^;]*)''', re.X), (RegexFlags.STORETIME, RegexFlags.FALLBACK)),
 
             # hold
             re.compile(r''':\s(?P<''' + constants.HOSTNAME_QID + r'''>[^:]*):\s
@@ -53,3 +54,4 @@ class Smtpd(SimplePlugin):
                            (?P<holdreason>[^;]*);\s
                            from=<(?P<sender>[^>]*)''', re.X)
         ]
+        self._dataTypes = {'statuscode': int}
@@ -11,6 +11,7 @@ class Spamd(SimplePlugin):
 
     def _define_subscription_regex(self):
         self._subscriptionRegex = re.compile(' spamd\[')
+        self._subscribedServices = ['spamd']
 
     def _define_data_regex(self):
         self._dataRegex = [
@@ -23,3 +24,10 @@ class Spamd(SimplePlugin):
                            required_score=(?P<spamrequiredscore>[^,]*).+?<
                            (?P<''' + constants.MESSAGEID + r'''>[^>]*)''', re.X)
         ]
+        self._dataTypes = {
+            'spamscore': float,
+            'spamscantime': float,
+            'size': int,
+            constants.UID: int,
+            'spamrequiredscore': float
+        }
@@ -10,6 +10,7 @@ class Amavis(PluginBase):
 
     def _define_subscription_regex(self):
         self._subscriptionRegex = re.compile(' amavis\[')
+        self._subscribedServices = ['amavis']
 
     def _define_data_regex(self):
         self._dataRegex = [
@@ -10,6 +10,7 @@ class Smtp(PluginBase):
 
     def _define_subscription_regex(self):
         self._subscriptionRegex = re.compile('postfix\/smtp\[')
+        self._subscribedServices = ['postfix/smtp']
 
     def _define_data_regex(self):
         self._dataRegex = [
@@ -22,6 +23,7 @@ class Local(PluginBase):
 
     def _define_subscription_regex(self):
         self._subscriptionRegex = re.compile('postfix\/local\[')
+        self._subscribedServices = ['postfix/local']
 
     def _define_data_regex(self):
         self._dataRegex = [
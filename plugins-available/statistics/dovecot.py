@@ -10,6 +10,7 @@ class Dovecot(PluginBase):
 
     def _define_subscription_regex(self):
         self._subscriptionRegex = re.compile(' dovecot\:')
+        self._subscribedServices = ['dovecot']
 
     def _define_data_regex(self):
         self._dataRegex = [
@@ -10,6 +10,7 @@ class Smtpd(PluginBase):
 
     def _define_subscription_regex(self):
         self._subscriptionRegex = re.compile(' postfix\/smtpd')
+        self._subscribedServices = ['postfix/smtpd']
 
     def _define_data_regex(self):
         self._dataRegex = [
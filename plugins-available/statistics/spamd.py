@@ -10,6 +10,7 @@ class Spamd(PluginBase):
 
     def _define_subscription_regex(self):
         self._subscriptionRegex = re.compile(' spamd\[')
+        self._subscribedServices = ['spamd']
 
     def _define_data_regex(self):
         self._dataRegex = [
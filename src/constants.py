@@ -55,6 +55,10 @@ DELIVERYMESSAGE = 'deliverymessage'
 
 LOGLINES = 'loglines'
 
+# hash of the loglines of a rejected mail (NOQUEUE), used to detect duplicates
+
+CONTENTHASH = 'contenthash'
+
 # Integrity
 
 COMPLETE = 'complete'
@@ -0,0 +1,66 @@
+"""Module which contains the DisjointSet used to correlate the ids of mails."""
+
+from typing import Dict, Hashable, List
+
+
+class DisjointSet():
+    """
+    Disjoint-set forest (union-find) over hashable nodes.
+
+    The nodes which are united belong to the same set (connected component).
+    Uses path compression and union by size, so a sequence of n operations
+    takes nearly linear time.
+    """
+
+    def __init__(self):
+        """Constructor of DisjointSet."""
+        self.__parent = {}
+        self.__size = {}
+
+    def __len__(self) -> int:
+        return len(self.__parent)
+
+    def add(self, node: Hashable) -> None:
+        """Add a node as its own set, unless it already exists."""
+        if node not in self.__parent:
+            self.__parent[node] = node
+            self.__size[node] = 1
+
+    def find(self, node: Hashable) -> Hashable:
+        """Return the representative of the set of a node (the node is added if needed)."""
+        self.add(node)
+
+        root = node
+        while self.__parent[root] != root:
+            root = self.__parent[root]
+
+        # path compression
+        while self.__parent[node] != root:
+            self.__parent[node], node = root, self.__parent[node]
+
+        return root
+
+    def union(self, a: Hashable, b: Hashable) -> Hashable:
+        """Unite the sets of two nodes and return the representative of the united set."""
+        rootA = self.find(a)
+        rootB = self.find(b)
+
+        if rootA == rootB:
+            return rootA
+
+        if self.__size[rootA] < self.__size[rootB]:
+            rootA, rootB = rootB, rootA
+
+        self.__parent[rootB] = rootA
+        self.__size[rootA] += self.__size.pop(rootB)
+
+        return rootA
+
+    def groups(self) -> Dict[Hashable, List[Hashable]]:
+        """Return all sets: representative -> nodes."""
+        groups = {}
+
+        for node in self.__parent:
+            groups.setdefault(self.find(node), []).append(node)
+
+        return groups
@@ -1,8 +1,9 @@
 """DataReceiver receives extracted data from logfiles and distributes them between IDataContainers."""
 
-from typing import List
+from typing import List, Dict
 
 from ..plugins.interfaces import IDataContainer
+from .fragment import Fragment
 from ..exceptions import print_warning
 
 
@@ -23,9 +24,9 @@ class DataReceiver():
 
         return filtered
 
-    def add_info(self, folderToData: dict) -> None:
+    def add_info(self, folderToData: Dict[str, Fragment]) -> None:
         """
-        Add some data to the containers.
+        Add some fragments to the containers.
         
         This method uses the subscribedFolder field of the containers
         to determine to which container it should give the data.
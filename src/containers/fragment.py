@@ -0,0 +1,31 @@
+"""Module which contains the Fragment class."""
+
+from typing import List
+
+
+class Fragment():
+    """
+    Data extracted from one logline for one data container.
+
+    pregexdata:     data extracted by the preregex (eg. hostname, time)
+    data:           list of (hasData, flags, data) returned by the plugins
+    raw_logline:    the logline itself
+
+    Lots of fragments are created while parsing, therefore this class uses
+    __slots__ instead of a dict. For compatibility the members can also be
+    accessed like the keys of a dict, eg. fragment['data'].
+    """
+
+    __slots__ = ('pregexdata', 'data', 'raw_logline')
+
+    def __init__(self, pregexdata: dict, data: List[tuple], raw_logline: str):
+        """Constructor of Fragment."""
+        self.pregexdata = pregexdata
+        self.data = data
+        self.raw_logline = raw_logline
+
+    def __getitem__(self, key: str) -> object:
+        if key not in self.__slots__:
+            raise KeyError(key)
+
+        return getattr(self, key)
@@ -47,6 +47,11 @@ class InvalidRegexFlag(Exception):
         super().__init__("Invalid regex-flag in: " + clsname + " pattern: " + pattern)
 
 
+class InvalidDataType(Exception):
+    def __init__(self, clsname, group):
+        super().__init__("Invalid data type in: " + clsname + " group: " + group)
+
+
 def print_exception(e: Exception, cause: str, measure: str, fatal: bool = False,
                     description: str = "Not available") -> None:
     """Prints an exception and additional information."""
@@ -0,0 +1,151 @@
+"""Module which contains the LogFollower."""
+
+import os
+import signal
+import sys
+import time
+
+from ..plugins.plugin_manager import PluginManager
+from ..plugins.interfaces import IFlushable
+from ..repository.interfaces import IRepository
+from .reader import FileReader, fingerprint
+
+
+class LogFollower():
+    """
+    Follow a logfile (like tail -f) and process the appended loglines.
+
+    The plugins, the containers with their fragments and the repository
+    are kept during the whole runtime. Every 'interval' seconds the
+    IFlushable containers store the data which is ready and the exact
+    position after the last processed line (and its fingerprint) is saved
+    in the repository.
+
+    If the logfile is truncated or replaced (eg. by logrotate), the rest of
+    the old logfile is processed and the new one is read from the beginning.
+    """
+
+    # seconds to wait for new loglines
+    __pollInterval = 1
+
+    def __init__(self,
+                 pluginManager: PluginManager,
+                 repository: IRepository,
+                 interval: float,
+                 bytesmode: bool = False,
+                 printmsgs: bool = False):
+        """Constructor of LogFollower."""
+        self.__pluginManager = pluginManager
+        self.__repository = repository
+        self.__interval = interval
+        self.__bytesmode = bytesmode
+        self.__printmsgs = printmsgs
+
+        self.__running = False
+        self.__linecounter = 0
+        self.__lastLine = None
+
+    @property
+    def fingerprint(self) -> str:
+        """Return the fingerprint of the last processed line (None if there is none)."""
+        if self.__lastLine is None:
+            return None
+
+        return fingerprint(self.__lastLine)
+
+    def stop(self, *args) -> None:
+        """Stop following after the current logline, may be used as signal handler."""
+        self.__running = False
+
+    def __process_line(self, line: bytes) -> None:
+        if self.__bytesmode:
+            self.__pluginManager.process_line_bytes(line)
+        else:
+            self.__pluginManager.process_line(line.decode('utf-8', errors='replace'))
+
+        self.__linecounter += 1
+        self.__lastLine = line
+
+        if self.__printmsgs:
+            sys.stdout.write('\rProcessed %d lines' % self.__linecounter)
+            sys.stdout.flush()
+
+    def __flush(self, offset: int) -> None:
+        """Store the data which is ready and save the position."""
+        for container in self.__pluginManager.dataReceiver.get_conainers_of_type(IFlushable):
+            container.flush()
+
+        self.__repository.save_position_of_last_read_byte(offset)
+
+        if self.__lastLine is not None:
+            self.__repository.save_fingerprint_of_last_read_line(self.fingerprint)
+
+    @staticmethod
+    def __is_replaced(logfile: str, inode: int, offset: int) -> bool:
+        """Check whether the logfile was truncated or replaced by another file."""
+        try:
+            stat = os.stat(logfile)
+        except FileNotFoundError as e:
+            # the new logfile is not yet created, keep reading the old one
+            return False
+
+        return stat.st_ino != inode or stat.st_size < offset
+
+    def follow(self, logfile: str, offset: int = 0, lastFingerprint: str = None) -> int:
+        """
+        Follow the logfile starting at 'offset' until stop is called (or SIGTERM/SIGINT).
+
+        If the line before 'offset' does not match 'lastFingerprint' (the fingerprint
+        of the last processed line) the logfile was rotated and is read from the beginning.
+
+        Return the position after the last processed line.
+        """
+        self.__running = True
+        signal.signal(signal.SIGTERM, self.stop)
+
+        with FileReader(logfile) as reader:
+            if not reader.resume(offset, lastFingerprint):
+                # the logfile was rotated since the position was saved
+                offset = 0
+
+        f = open(logfile, 'rb')
+        inode = os.fstat(f.fileno()).st_ino
+
+        f.seek(offset)
+        lastFlush = time.time()
+
+        try:
+            while self.__running:
+                line = f.readline()
+
+                if line.endswith(b'\n'):
+                    offset += len(line)
+                    self.__process_line(line)
+                else:
+                    # no new or only a partially written logline
+                    f.seek(offset)
+
+                    if self.__is_replaced(logfile, inode, offset):
+                        for line in f:
+                            if line.endswith(b'\n'):
+                                self.__process_line(line)
+
+                        f.close()
+                        f = open(logfile, 'rb')
+                        inode = os.fstat(f.fileno()).st_ino
+                        offset = 0
+                    else:
+                        time.sleep(self.__pollInterval)
+
+                if time.time() - lastFlush >= self.__interval:
+                    self.__flush(offset)
+                    lastFlush = time.time()
+        except KeyboardInterrupt as e:
+            pass
+        finally:
+            f.close()
+
+        if self.__printmsgs:
+            print('')
+
+        return offset
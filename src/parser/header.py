@@ -0,0 +1,153 @@
+"""Module which contains the HeaderParser."""
+
+import re
+import sys
+from typing import List
+
+
+class HeaderParser():
+    """
+    Extract the generic information (datetime, hostname) from the header of a logline.
+
+    The information is extracted using the preregex given in the config.
+    Optionally the header of the ISO-8601 rsyslog format can be decoded
+    by position instead, which is a lot faster than applying the regex:
+
+    2017-03-28T17:00:00.123456+02:00 phd-mxin/phd-mxin postfix/smtpd[7418]: ...
+    └─┬┘ └┤ └┤ └──┬───┘       └─┬─┘ └──┬───┘
+    year  │ day  time       timezone hostname
+        month
+
+    This yields the same groups as the default preregex: year, month, day,
+    time, timezone and hostname. Loglines which do not have this layout
+    fall back to the preregex.
+
+    Loglines which do not originate from one of the 'limitHosts'
+    are rejected before any regex is applied. The hostnames are
+    interned, so that all fragments share the same str objects.
+    """
+
+    def __init__(self, preRegex: str, limitHosts: List[str], iso8601: bool = False):
+        """Constructor of HeaderParser."""
+        self.__preRegex = re.compile(preRegex)
+        self.__limitHosts = frozenset(limitHosts)
+        self.__iso8601 = iso8601
+
+        # used in bytes mode, note that \w, \s, etc. only
+        # match ASCII characters in a bytes regex
+        self.__preRegexBytes = re.compile(preRegex.encode('utf-8'))
+        self.__limitHostsBytes = [host.encode('utf-8') for host in limitHosts]
+
+    @staticmethod
+    def _decode_iso8601(line: str) -> dict:
+        """Decode the header by position, return None if the line has another layout."""
+        if len(line) < 20 or \
+                line[4] != '-' or line[7] != '-' or line[10] != 'T' or line[13] != ':' or line[16] != ':':
+            return None
+
+        year = line[0:4]
+        month = line[5:7]
+        day = line[8:10]
+        time = line[11:19]
+
+        if not (year.isdecimal() and month.isdecimal() and day.isdecimal() and
+                time[0:2].isdecimal() and time[3:5].isdecimal() and time[6:8].isdecimal()):
+            return None
+
+        # fractions of a second are followed by the timezone: .123456+02:00
+        headerEnd = line.find(' ', 19)
+        if headerEnd == -1:
+            return None
+
+        timezone = line[19:headerEnd].partition('+')[2]
+        if len(timezone) != 5 or timezone[2] != ':' or \
+                not (timezone[0:2].isdecimal() and timezone[3:5].isdecimal()):
+            return None
+
+        # the hostname ends at the first character which is not a word character or a '-'
+        # eg. phd-mxin/phd-mxin --> phd-mxin
+        hostEnd = line.find(' ', headerEnd + 1)
+        if hostEnd == -1:
+            return None
+
+        hostname = line[headerEnd + 1:hostEnd].partition('/')[0]
+        if not hostname.replace('-', '').replace('_', '').isalnum():
+            return None
+
+        return {
+            'year': year,
+            'month': month,
+            'day': day,
+            'time': time,
+            'timezone': timezone,
+            'hostname': hostname
+        }
+
+    def parse(self, line: str) -> dict:
+        """
+        Return the extracted information of the header of a logline.
+
+        Return None if the header could not be parsed or if the
+        logline does not originate from one of the limited hosts.
+        """
+        pre = None
+
+        if self.__iso8601:
+            pre = self._decode_iso8601(line)
+
+        if pre is None:
+            # the hostname is a part of the logline, if no limited host
+            # is found in the logline we do not need to apply the preregex
+            for host in self.__limitHosts:
+                if host in line:
+                    break
+            else:
+                return None
+
+            pre = self.__preRegex.search(line)
+
+            if pre is None:
+                return None
+
+            pre = pre.groupdict()
+
+        hostname = pre.get('hostname')
+        if hostname is None or hostname not in self.__limitHosts:
+            return None
+
+        pre['hostname'] = sys.intern(hostname)
+
+        return pre
+
+    def parse_bytes(self, line: bytes) -> dict:
+        """Same as parse but for an undecoded logline, the returned values are decoded."""
+        pre = None
+
+        if self.__iso8601:
+            # only decode the header: everything up to the space after the hostname
+            headerEnd = line.find(b' ', line.find(b' ') + 1)
+            if headerEnd != -1:
+                pre = self._decode_iso8601(line[:headerEnd + 1].decode('utf-8', errors='replace'))
+
+        if pre is None:
+            for host in self.__limitHostsBytes:
+                if host in line:
+                    break
+            else:
+                return None
+
+            pre = self.__preRegexBytes.search(line)
+
+            if pre is None:
+                return None
+
+            pre = {key: value.decode('utf-8', errors='replace') if value is not None else None
+                   for key, value in pre.groupdict().items()}
+
+        hostname = pre.get('hostname')
+        if hostname is None or hostname not in self.__limitHosts:
+            return None
+
+        pre['hostname'] = sys.intern(hostname)
+
+        return pre
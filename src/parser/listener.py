@@ -0,0 +1,183 @@
+"""Module which contains the SyslogListener."""
+
+import os
+import queue
+import re
+import signal
+import socket
+import sys
+import threading
+import time
+from typing import List, Tuple
+
+from ..plugins.plugin_manager import PluginManager
+from ..plugins.interfaces import IFlushable
+from ..exceptions import print_warning
+
+
+class SyslogListener():
+    """
+    Receive syslog messages from a local socket and process them like loglines.
+
+    The address is either 'udp:HOST:PORT' or 'unix:PATH' (unix datagram socket).
+    A receiver thread reads the datagrams and hands them over in batches
+    through a bounded queue, so that a burst of messages does not block
+    the socket while the plugins are busy. If the queue is full, the batch
+    is dropped (like the kernel would drop the datagrams) and counted.
+
+    The priority (eg. '<22>') is removed from each message, the rest has
+    to match the preregex like a logline of the logfile. Every 'interval'
+    seconds the IFlushable containers store the data which is ready.
+    """
+
+    # seconds to wait for further messages before a batch is handed over
+    __batchTimeout = 0.1
+    __maxDatagramSize = 65536
+    __priorityRegex = re.compile(rb'^<\d{1,3}>')
+
+    def __init__(self,
+                 pluginManager: PluginManager,
+                 interval: float,
+                 bytesmode: bool = False,
+                 printmsgs: bool = False,
+                 queueSize: int = 1000,
+                 batchSize: int = 100):
+        """Constructor of SyslogListener."""
+        self.__pluginManager = pluginManager
+        self.__interval = interval
+        self.__bytesmode = bytesmode
+        self.__printmsgs = printmsgs
+        self.__batchSize = batchSize
+
+        self.__queue = queue.Queue(queueSize)
+        self.__running = False
+        self.__linecounter = 0
+        self.__dropped = 0
+
+    def stop(self, *args) -> None:
+        """Stop listening after the current batch, may be used as signal handler."""
+        self.__running = False
+
+    @staticmethod
+    def parse_address(address: str) -> Tuple[int, object]:
+        """Return the socket family and the address to bind to of 'udp:HOST:PORT' or 'unix:PATH'."""
+        kind, _, rest = address.partition(':')
+
+        if kind == 'udp':
+            host, _, port = rest.rpartition(':')
+            return socket.AF_INET, (host or '127.0.0.1', int(port))
+        elif kind == 'unix':
+            return socket.AF_UNIX, rest
+
+        raise ValueError('Unknown address "%s", expected udp:HOST:PORT or unix:PATH' % address)
+
+    def __enqueue(self, batch: List[bytes]) -> None:
+        try:
+            self.__queue.put_nowait(batch)
+        except queue.Full as e:
+            self.__dropped += len(batch)
+
+    def __receive(self, sock: socket.socket) -> None:
+        """Receive datagrams and put them into the queue in batches (runs in a thread)."""
+        batch = []
+
+        while self.__running:
+            try:
+                batch.append(sock.recv(self.__maxDatagramSize))
+
+                if len(batch) < self.__batchSize:
+                    continue
+            except socket.timeout as e:
+                if len(batch) == 0:
+                    continue
+
+            self.__enqueue(batch)
+            batch = []
+
+        if len(batch) > 0:
+            self.__enqueue(batch)
+
+    def __messages_to_lines(self, batch: List[bytes]) -> List[bytes]:
+        lines = []
+
+        for message in batch:
+            for line in message.splitlines():
+                line = self.__priorityRegex.sub(b'', line, 1)
+                if line:
+                    lines.append(line + b'\n')
+
+        return lines
+
+    def __process_batch(self, batch: List[bytes]) -> None:
+        for line in self.__messages_to_lines(batch):
+            if self.__bytesmode:
+                self.__pluginManager.process_line_bytes(line)
+            else:
+                self.__pluginManager.process_line(line.decode('utf-8', errors='replace'))
+
+            self.__linecounter += 1
+
+        if self.__printmsgs:
+            sys.stdout.write('\rProcessed %d lines' % self.__linecounter)
+            sys.stdout.flush()
+
+    def __flush(self) -> None:
+        """Store the data which is ready."""
+        for container in self.__pluginManager.dataReceiver.get_conainers_of_type(IFlushable):
+            container.flush()
+
+        if self.__dropped > 0:
+            print_warning('Dropped %d syslog messages, the queue was full.' % self.__dropped)
+            self.__dropped = 0
+
+    def listen(self, address: str) -> int:
+        """
+        Process the messages received on 'address' until stop is called (or SIGTERM/SIGINT).
+
+        Return the number of processed lines.
+        """
+        family, bindAddress = self.parse_address(address)
+
+        sock = socket.socket(family, socket.SOCK_DGRAM)
+        if family == socket.AF_UNIX and os.path.exists(bindAddress):
+            os.remove(bindAddress)
+
+        sock.bind(bindAddress)
+        sock.settimeout(self.__batchTimeout)
+
+        self.__running = True
+        signal.signal(signal.SIGTERM, self.stop)
+
+        receiver = threading.Thread(target=self.__receive, args=(sock,), daemon=True)
+        receiver.start()
+
+        lastFlush = time.time()
+
+        try:
+            while self.__running:
+                try:
+                    self.__process_batch(self.__queue.get(timeout=self.__batchTimeout))
+                except queue.Empty as e:
+                    pass
+
+                if time.time() - lastFlush >= self.__interval:
+                    self.__flush()
+                    lastFlush = time.time()
+        except KeyboardInterrupt as e:
+            pass
+        finally:
+            self.__running = False
+            receiver.join()
+            sock.close()
+
+            if family == socket.AF_UNIX:
+                os.remove(bindAddress)
+
+        # process the messages which were already received
+        while not self.__queue.empty():
+            self.__process_batch(self.__queue.get_nowait())
+
+        if self.__printmsgs:
+            print('')
+
+        return self.__linecounter
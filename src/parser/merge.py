@@ -0,0 +1,60 @@
+"""Module which contains the TimestampMerger."""
+
+import heapq
+from datetime import datetime, timedelta
+from typing import List, Iterator, Tuple
+
+from .header import HeaderParser
+from .reader import LineReader
+
+
+class TimestampMerger():
+    """
+    Merge logfiles which are ordered on their own (eg. one per host) by the timestamp of the loglines.
+
+    The logfiles are read lazily and merged using a heap (k-way merge),
+    so only one logline per logfile is held in memory. The timestamp is
+    extracted by the HeaderParser. Loglines without a timestamp (eg. from
+    hosts which are not in limit_hosts) stay right after the previous
+    logline of their logfile. Loglines with the same timestamp are
+    returned in the order of the logfiles.
+    """
+
+    def __init__(self, readers: List[LineReader], headerParser: HeaderParser):
+        """Constructor of TimestampMerger."""
+        self.__readers = readers
+        self.__headerParser = headerParser
+
+    @staticmethod
+    def _timestamp(pre: dict) -> datetime:
+        """Return the timestamp (UTC if the timezone is known) of the extracted header."""
+        try:
+            hour, minute, second = pre['time'].split(':')
+            timestamp = datetime(int(pre.get('year') or 1900), int(pre['month']), int(pre['day']),
+                                 int(hour), int(minute), int(second))
+        except (KeyError, TypeError, ValueError) as e:
+            return None
+
+        timezone = pre.get('timezone')
+        if timezone is not None and len(timezone) == 5:
+            timestamp -= timedelta(hours=int(timezone[0:2]), minutes=int(timezone[3:5]))
+
+        return timestamp
+
+    def __keyed_lines(self, index: int, reader: LineReader) -> Iterator[Tuple[datetime, int, bytes]]:
+        """Return the lines of a logfile together with their sort key."""
+        timestamp = datetime.min
+
+        for line in reader:
+            pre = self.__headerParser.parse_bytes(line)
+
+            if pre is not None:
+                timestamp = self._timestamp(pre) or timestamp
+
+            yield timestamp, index, line
+
+    def __iter__(self) -> Iterator[bytes]:
+        keyedLines = [self.__keyed_lines(index, reader) for index, reader in enumerate(self.__readers)]
+
+        for timestamp, index, line in heapq.merge(*keyedLines):
+            yield line
@@ -0,0 +1,368 @@
+"""Module which contains readers for logfiles."""
+
+import bz2
+import gzip
+import hashlib
+import io
+import lzma
+import mmap
+import multiprocessing
+from typing import Iterator
+
+
+# magic bytes at the beginning of a compressed logfile
+# and the module which decompresses it
+_compressions = [
+    (b'\x1f\x8b', gzip),
+    (b'BZh', bz2),
+    (b'\xfd7zXZ\x00', lzma)
+]
+
+
+def get_compression(path: str) -> object:
+    """Return the module which decompresses the logfile (gzip, bz2 or lzma), None if it is not compressed."""
+    with open(path, 'rb') as f:
+        magic = f.read(6)
+
+    for magicBytes, module in _compressions:
+        if magic.startswith(magicBytes):
+            return module
+
+    return None
+
+
+def fingerprint(line: bytes) -> str:
+    """Return the fingerprint of a logline: '<length>:<sha1 of the logline>'."""
+    return '%d:%s' % (len(line), hashlib.sha1(line).hexdigest())
+
+
+def fingerprint_length(fingerprint: str) -> int:
+    """Return the length of the logline a fingerprint was created of."""
+    return int(fingerprint.split(':', 1)[0])
+
+
+class LineReader():
+    """
+    Base of the logfile readers.
+
+    The lines are returned undecoded (bytes) including the trailing newline.
+    A last line which is not terminated by a newline is not returned, as it
+    is probably still being written.
+
+    'offset' is the exact byte position after the last line which was
+    completely processed by the client, a line counts as processed as
+    soon as the client requests the next one. 'fingerprint' identifies
+    this line, so that the next run can verify where it resumes.
+    """
+
+    def __init__(self, path: str):
+        """Constructor of LineReader."""
+        self._path = path
+        self._file = open(path, 'rb')
+        self._offset = 0
+        self._lastLine = None
+
+    @property
+    def path(self) -> str:
+        """Return the path of the logfile."""
+        return self._path
+
+    @property
+    def offset(self) -> int:
+        """Return the byte position after the last processed line."""
+        return self._offset
+
+    @property
+    def fingerprint(self) -> str:
+        """Return the fingerprint of the last processed line (None if there is none)."""
+        if self._lastLine is None:
+            return None
+
+        return fingerprint(self._lastLine)
+
+    def _read(self, pos: int, size: int) -> bytes:
+        """Return 'size' bytes starting at 'pos'."""
+        raise NotImplementedError()
+
+    def resume(self, offset: int, lastFingerprint: str) -> bool:
+        """
+        Skip the lines before 'offset' if they were already processed.
+
+        The line ending at 'offset' has to match the fingerprint of the last
+        processed line, otherwise the logfile was replaced and nothing is skipped.
+        Without a fingerprint (eg. saved by an older version) only the size of
+        the logfile is checked. Return whether the lines were skipped.
+        """
+        if lastFingerprint is None:
+            if offset > 0 and len(self._read(offset - 1, 1)) == 0:
+                return False
+
+            self._offset = offset
+            return True
+
+        length = fingerprint_length(lastFingerprint)
+        if offset < length:
+            return False
+
+        line = self._read(offset - length, length)
+        if not line.endswith(b'\n') or fingerprint(line) != lastFingerprint:
+            return False
+
+        self._offset = offset
+        self._lastLine = line
+
+        return True
+
+    def close(self) -> None:
+        """Close the logfile."""
+        self._file.close()
+
+    def __enter__(self) -> 'LineReader':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class FileReader(LineReader):
+    """Iterate over the lines of a logfile using a buffered file."""
+
+    def _read(self, pos: int, size: int) -> bytes:
+        self._file.seek(pos)
+        return self._file.read(size)
+
+    def __iter__(self) -> Iterator[bytes]:
+        self._file.seek(self._offset)
+
+        for line in self._file:
+            if not line.endswith(b'\n'):
+                return
+
+            yield line
+
+            self._offset += len(line)
+            self._lastLine = line
+
+
+class MmapReader(LineReader):
+    """Iterate over the lines of a logfile using a memory map."""
+
+    def __init__(self, path: str):
+        """Constructor of MmapReader."""
+        super().__init__(path)
+
+        try:
+            self.__map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as e:
+            # empty files cannot be mapped
+            self.__map = None
+
+    def _read(self, pos: int, size: int) -> bytes:
+        if self.__map is None:
+            return b''
+
+        return self.__map[pos:pos + size]
+
+    def skip_to_end(self) -> None:
+        """Mark all lines as processed (eg. when they are processed by someone else)."""
+        if self.__map is None:
+            return
+
+        end = self.__map.rfind(b'\n') + 1
+        if end > self._offset:
+            self._lastLine = self.__map[self.__map.rfind(b'\n', 0, end - 1) + 1:end]
+            self._offset = end
+
+    def __iter__(self) -> Iterator[bytes]:
+        if self.__map is None:
+            return
+
+        pos = self._offset
+        while True:
+            end = self.__map.find(b'\n', pos)
+            if end == -1:
+                return
+
+            end += 1
+            line = self.__map[pos:end]
+            yield line
+
+            self._offset = end
+            self._lastLine = line
+            pos = end
+
+    def close(self) -> None:
+        """Unmap and close the logfile."""
+        if self.__map is not None:
+            self.__map.close()
+
+        super().close()
+
+
+def _decompress(path: str, connection: object, blockSize: int) -> None:
+    """Decompress the logfile and send it in blocks (runs in a separate process)."""
+    try:
+        with get_compression(path).open(path, 'rb') as f:
+            while True:
+                block = f.read(blockSize)
+                connection.send_bytes(block)
+
+                if not block:
+                    break
+    except BrokenPipeError as e:
+        # the reader was closed before the end of the logfile
+        pass
+    finally:
+        connection.close()
+
+
+class _DecompressionProcess(io.RawIOBase):
+    """Stream of a logfile which is decompressed in a separate process."""
+
+    def __init__(self, path: str, blockSize: int):
+        """Constructor of _DecompressionProcess."""
+        self.__connection, sender = multiprocessing.Pipe(duplex=False)
+        self.__process = multiprocessing.Process(target=_decompress, args=(path, sender, blockSize), daemon=True)
+        self.__process.start()
+        sender.close()
+
+        self.__block = memoryview(b'')
+        self.__eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: bytearray) -> int:
+        while len(self.__block) == 0 and not self.__eof:
+            block = self.__connection.recv_bytes()
+            self.__block = memoryview(block)
+            self.__eof = len(block) == 0
+
+        size = min(len(buffer), len(self.__block))
+        buffer[:size] = self.__block[:size]
+        self.__block = self.__block[size:]
+
+        return size
+
+    def close(self) -> None:
+        if not self.closed:
+            self.__connection.close()
+            self.__process.terminate()
+            self.__process.join()
+
+        super().close()
+
+
+class StreamReader(LineReader):
+    """
+    Iterate over the lines of a stream which can only be read forward (eg. the output of a process).
+
+    The bytes read while resuming are kept, so that the lines can
+    still be processed from the beginning if resuming fails.
+    """
+
+    _blockSize = 1 << 20
+
+    def __init__(self, stream: io.IOBase, path: str = '<stream>'):
+        """Constructor of StreamReader."""
+        self._path = path
+        self._file = None
+        self._offset = 0
+        self._lastLine = None
+
+        if stream is not None:
+            self._file = self._buffered(stream)
+
+        # position in the stream and the bytes read by _read
+        self._position = 0
+        self.__kept = b''
+        self.__keptFrom = 0
+
+    def _buffered(self, stream: io.IOBase) -> io.IOBase:
+        if isinstance(stream, io.RawIOBase):
+            return io.BufferedReader(stream, self._blockSize)
+
+        return stream
+
+    def _rewind(self) -> None:
+        """Read the stream from the beginning again."""
+        raise IOError('%s cannot be read backwards' % self._path)
+
+    def _skip(self, pos: int) -> None:
+        """Read forward to 'pos'."""
+        if pos < self._position:
+            self._rewind()
+
+        while self._position < pos:
+            block = self._file.read(min(self._blockSize, pos - self._position))
+            if not block:
+                break
+
+            self._position += len(block)
+
+    def _read(self, pos: int, size: int) -> bytes:
+        if pos < self._position or pos - self._position > self._blockSize:
+            self._skip(pos)
+
+        # also keep the bytes in front of 'pos' (usually the beginning of the stream)
+        self.__keptFrom = self._position
+        self.__kept = self._file.read(pos + size - self._position)
+        self._position += len(self.__kept)
+
+        return self.__kept[pos - self.__keptFrom:]
+
+    def __lines(self, kept: bytes) -> Iterator[bytes]:
+        for line in io.BytesIO(kept):
+            if not line.endswith(b'\n'):
+                line += self._file.readline()
+
+            yield line
+
+        yield from self._file
+
+    def __iter__(self) -> Iterator[bytes]:
+        kept = b''
+        if self.__keptFrom <= self._offset < self._position:
+            kept = self.__kept[self._offset - self.__keptFrom:]
+        else:
+            self._skip(self._offset)
+
+        self.__kept = b''
+
+        for line in self.__lines(kept):
+            if not line.endswith(b'\n'):
+                return
+
+            yield line
+
+            self._offset += len(line)
+            self._lastLine = line
+
+
+class CompressedReader(StreamReader):
+    """
+    Iterate over the lines of a compressed logfile (gzip, bz2 or xz).
+
+    The compression is detected by the magic bytes of the logfile and the
+    offsets refer to the decompressed logfile. If 'process' is set, the
+    logfile is decompressed in a separate process while the lines are
+    processed.
+    """
+
+    def __init__(self, path: str, process: bool = False):
+        """Constructor of CompressedReader."""
+        self.__process = process
+
+        super().__init__(None, path)
+        self._rewind()
+
+    def _rewind(self) -> None:
+        if self._file is not None:
+            self._file.close()
+
+        if self.__process:
+            self._file = self._buffered(_DecompressionProcess(self._path, self._blockSize))
+        else:
+            self._file = get_compression(self._path).open(self._path, 'rb')
+
+        self._position = 0
@@ -0,0 +1,136 @@
+"""Module which contains the ShardedParser."""
+
+import os
+import sys
+from multiprocessing import Pool
+from typing import List, Tuple, Dict
+
+from ..config import Config
+from ..plugins.plugin_manager import PluginManager
+from ..plugins.interfaces import IMergeable
+from ..exceptions import print_warning
+
+# PluginManager of a worker process, created in _init_worker.
+# Every worker processes exactly one shard (maxtasksperchild=1),
+# so that the containers only hold the data of this shard.
+_workerPluginManager = None
+
+
+def _init_worker(configfile: str, basepath: str, overwrite: dict, absPluginsPath: str) -> None:
+    """Setup the config and the plugins of a worker process."""
+    global _workerPluginManager
+
+    # the config is a singleton, depending on how the process was
+    # started (fork or spawn) it may not be setup in this process.
+    # A shard only contains a part of the lifecycle of a mail, therefore
+    # the workers must not aggregate mails while parsing (streaming)
+    Config().setup(configfile, basepath, dict(overwrite, streaming=False))
+    _workerPluginManager = PluginManager(absPluginsPath=absPluginsPath)
+
+
+def _process_shard(shard: Tuple[str, int, int]) -> Tuple[int, Dict[str, object]]:
+    """
+    Process all loglines of a shard: (logfile, start byte, end byte)
+
+    Return the number of processed lines and the data of all
+    IMergeable containers mapped by their class name.
+    """
+    logfile, start, end = shard
+    linecounter = 0
+    bytesmode = Config().get('bytesmode') is True
+
+    with open(logfile, 'rb') as f:
+        f.seek(start)
+        pos = start
+
+        while pos < end:
+            line = f.readline()
+            if not line:
+                break
+
+            pos += len(line)
+            linecounter += 1
+
+            if bytesmode:
+                _workerPluginManager.process_line_bytes(line)
+            else:
+                _workerPluginManager.process_line(line.decode('utf-8', errors='replace'))
+
+    containers = _workerPluginManager.dataReceiver.get_conainers_of_type(IMergeable)
+    return linecounter, {c.__class__.__name__: c.get_mergeable_data() for c in containers}
+
+
+class ShardedParser():
+    """
+    Parse a logfile in parallel.
+
+    The logfile is split into line aligned byte ranges (shards) which
+    are processed by a pool of worker processes. Each worker has its own
+    PluginManager and containers. The data collected by those containers
+    is then merged, in the order of the logfile, into the containers of the
+    given PluginManager. (Only containers implementing IMergeable are supported)
+    """
+
+    def __init__(self, pluginManager: PluginManager, workers: int, initargs: tuple):
+        """
+        Constructor of ShardedParser.
+
+        'initargs' are the arguments needed to setup a worker process:
+        (configfile, basepath, config overwrite, absolute plugins path)
+        """
+        self._pluginManager = pluginManager
+        self._workers = workers
+        self._initargs = initargs
+
+    @staticmethod
+    def split_logfile(logfile: str, count: int, start: int = 0, end: int = None) -> List[Tuple[int, int]]:
+        """
+        Split the bytes 'start' to 'end' of a logfile into at most 'count' byte ranges.
+
+        Each range starts at the beginning of a line and ends where the
+        next range starts, so that no line is split between two ranges.
+        """
+        size = os.path.getsize(logfile) if end is None else end
+        boundaries = [start]
+
+        with open(logfile, 'rb') as f:
+            for i in range(1, count):
+                f.seek(max(start + (size - start) * i // count, boundaries[-1]))
+                # skip the rest of the line, it belongs to the previous range
+                f.readline()
+                boundaries.append(min(f.tell(), size))
+
+        boundaries.append(size)
+
+        return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if start < end]
+
+    def parse(self, logfile: str, printmsgs: bool = False, start: int = 0, end: int = None) -> int:
+        """Parse the bytes 'start' to 'end' of the logfile and return the number of processed lines."""
+        containers = self._pluginManager.dataReceiver.containers
+        for container in containers:
+            if not isinstance(container, IMergeable):
+                print_warning(container.__class__.__name__ + ' does not support parallel parsing, ' +
+                              'it will not receive any data.')
+
+        shards = self.split_logfile(logfile, self._workers, start, end)
+        linecounter = 0
+
+        with Pool(self._workers,
+                  initializer=_init_worker,
+                  initargs=self._initargs,
+                  maxtasksperchild=1) as pool:
+            # imap returns the results in order of the logfile, so
+            # we can already merge a shard while the next ones are processed
+            for lines, data in pool.imap(_process_shard, [(logfile, start, end) for start, end in shards]):
+                linecounter += lines
+
+                for container in containers:
+                    shardData = data.get(container.__class__.__name__)
+                    if shardData is not None:
+                        container.merge(shardData)
+
+                if printmsgs:
+                    sys.stdout.write('\rProcessed %d lines' % linecounter)
+                    sys.stdout.flush()
+
+        return linecounter
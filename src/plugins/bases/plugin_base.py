@@ -1,24 +1,62 @@
 """Here are the base classes of every Plugin."""
 
 import abc
-from ast import literal_eval
+import re
+import sys
 from enum import Enum
 
-from ..interfaces import IPlugin
-from ...exceptions import NoSubscriptionRegex, NoDataRegex, RegexGroupsMissing, InvalidRegexFlag
+from typing import List, Tuple, Callable
+
+from ..interfaces import IPlugin, IServiceSubscriber, IBytesPlugin
+from ...config import Config
+from ...exceptions import NoSubscriptionRegex, NoDataRegex, RegexGroupsMissing, InvalidRegexFlag, \
+                          InvalidDataType
 
 
 class RegexFlags(Enum):
     STORETIME = 1,
     PICKUP = 2
+    # the logline marks the end of the lifecycle of a queue id
+    REMOVED = 3
+    # the regex also matches loglines of the regexps declared before it,
+    # so it is always tried after them (see adaptive_data_regex)
+    FALLBACK = 4
+
+
+def _parse_bool(value: str) -> bool:
+    lower = value.lower()
+
+    if lower in ('true', 'yes', '1'):
+        return True
+    elif lower in ('false', 'no', '0'):
+        return False
 
+    raise ValueError('Not a boolean: ' + value)
 
-class PluginBase(IPlugin, metaclass=abc.ABCMeta):
+
+class PluginBase(IPlugin, IServiceSubscriber, IBytesPlugin, metaclass=abc.ABCMeta):
     """Base class of every plugin, which contains generalized logic."""
 
+    # number of gathered loglines after which the data regexps are reordered
+    __reorderInterval = 1000
+
+    # data type --> function which parses a stripped str into this type
+    __dataTypeParsers = {
+        str: None,
+        int: int,
+        float: float,
+        bool: _parse_bool
+    }
+
     def __init__(self):
         """Constructor of PluginBase."""
+        # cache: hostname -> group name -> (specified group name, is BOOL)
+        self._specifiedGroupNames = {}
+
         self._subscriptionRegex = None
+        # optional: list of syslog services (eg. 'postfix/smtpd') this plugin
+        # is interested in, may be assigned in _define_subscription_regex
+        self._subscribedServices = None
         self._define_subscription_regex()
 
         # sanity check of subscription regex
@@ -26,6 +64,9 @@ class PluginBase(IPlugin, metaclass=abc.ABCMeta):
             raise NoSubscriptionRegex(self.__class__.__name__)
 
         self._dataRegex = None
+        # optional: types of the regex groups (eg. {'size': int}), groups
+        # which are not listed are str, may be assigned in _define_data_regex
+        self._dataTypes = {}
         self._define_data_regex()
 
         # sanity check of data regex:
@@ -62,19 +103,127 @@ class PluginBase(IPlugin, metaclass=abc.ABCMeta):
         if r:
             raise RegexGroupsMissing(self.__class__.__name__, info)
 
+        # sanity check of data types
+        for group, dataType in self._dataTypes.items():
+            if dataType not in self.__dataTypeParsers:
+                raise InvalidDataType(self.__class__.__name__, group)
+
+        # converters of the captured values, one table per data regex
+        self._dataConverters = [self._create_converters(regex, False) for regex, flags in self._dataRegex]
+        self._dataConvertersBytes = [self._create_converters(regex, True) for regex, flags in self._dataRegex]
+
+        # the data regexps are tried in this order (indexes of self._dataRegex),
+        # in adaptive mode the most matching regexps are tried first
+        self._dataRegexOrder = list(range(len(self._dataRegex)))
+        self._dataRegexHits = [0] * len(self._dataRegex)
+        self._adaptiveDataRegex = Config().get('adaptive_data_regex') is True
+        self._gatherCounter = 0
+
+        # bytes equivalents of the regexps, used in bytes mode
+        try:
+            self._subscriptionRegexBytes = self._compile_bytes_regex(self._subscriptionRegex)
+            self._dataRegexBytes = [(self._compile_bytes_regex(regex), flags) for regex, flags in self._dataRegex]
+        except Exception as e:
+            # eg. the plugin uses custom regex objects, in this case
+            # the loglines are decoded and given to the str regexps
+            self._subscriptionRegexBytes = None
+            self._dataRegexBytes = None
+
+    @staticmethod
+    def _compile_bytes_regex(regex: object) -> object:
+        """
+        Compile a str regex into a regex which matches bytes.
+
+        Note that character classes like \\w or \\s only match ASCII characters in bytes regexps.
+        """
+        return re.compile(regex.pattern.encode('utf-8'), regex.flags & ~re.UNICODE)
+
+    def _create_converters(self, regex: object, decode: bool) -> List[Tuple[str, Callable[[object], object]]]:
+        """Return a tuple (group name, converter) for each named group of a data regex."""
+        return [(group, self._create_converter(self.__dataTypeParsers[self._dataTypes.get(group, str)], decode))
+                for group in regex.groupindex]
+
+    @staticmethod
+    def _create_converter(parse: Callable[[str], object], decode: bool) -> Callable[[object], object]:
+        """
+        Create a function which converts a captured value.
+
+        The value is decoded (bytes mode), stripped and then parsed. If
+        it can not be parsed, the stripped str is returned.
+        """
+        def convert(value: object) -> object:
+            if value is None:
+                return None
+
+            if decode:
+                value = value.decode('utf-8', errors='replace')
+
+            value = value.strip()
+
+            if parse is None:
+                return value
+
+            try:
+                return parse(value)
+            except ValueError as e:
+                return value
+
+        return convert
+
     @abc.abstractmethod
     def _define_subscription_regex(self) -> None:
-        """Assign the compiled subscription regex to self."""
+        """Assign the compiled subscription regex (and optionally the subscribed services) to self."""
         pass
 
     @abc.abstractmethod
     def _define_data_regex(self) -> None:
-        """Assign the compiled data regex to self."""
+        """Assign the compiled data regex (and optionally the data types) to self."""
         pass
 
+    @property
+    def subscribedServices(self) -> List[str]:
+        return self._subscribedServices
+
+    @property
+    def dataRegexHits(self) -> List[Tuple[str, int]]:
+        """Return the pattern and the number of matched loglines of each data regex."""
+        return [(regex.pattern, hits) for (regex, flags), hits in zip(self._dataRegex, self._dataRegexHits)]
+
+    def _reorder_data_regex(self) -> None:
+        """
+        Order the data regexps by their hits.
+
+        A regex flagged with FALLBACK stays after all regexps declared before it.
+        """
+        order = []
+        remaining = list(range(len(self._dataRegex)))
+
+        while len(remaining) > 0:
+            candidates = []
+            for index in remaining:
+                if RegexFlags.FALLBACK in self._dataRegex[index][1] and index != remaining[0]:
+                    # regexps declared before the fallback are not ordered yet
+                    continue
+
+                candidates.append(index)
+
+            # the regex with the most hits, on equal hits the one declared first
+            best = max(candidates, key=lambda index: (self._dataRegexHits[index], -index))
+
+            order.append(best)
+            remaining.remove(best)
+
+        self._dataRegexOrder = order
+
     def check_subscription(self, line: str) -> bool:
         return self._subscriptionRegex.search(line) is not None
 
+    def check_subscription_bytes(self, line: bytes) -> bool:
+        if self._subscriptionRegexBytes is None:
+            return self.check_subscription(line.decode('utf-8', errors='replace'))
+
+        return self._subscriptionRegexBytes.search(line) is not None
+
     def __check_data_regex_group_names(self) -> tuple:
         """
         Check if the user has any named groups defined in the regex.
@@ -107,38 +256,55 @@ class PluginBase(IPlugin, metaclass=abc.ABCMeta):
         └────────┬─────────┘         └─┬─┘
             replacement              flags
             keywords
+
+        The specified group names only depend on the hostname, therefore
+        they are created once per hostname and group (_specify_group_name).
         """
+        hostname = preRegexMatches.get('hostname')
+
+        groupNames = self._specifiedGroupNames.get(hostname)
+        if groupNames is None:
+            groupNames = self._specifiedGroupNames[hostname] = {}
 
         newDataRegexMatches = {}
 
         for key, value in dataRegexMatches.items():
-            newName = key
-            hostname = preRegexMatches.get('hostname')
-            servicename = self.__class__.__name__.lower()
-
-            if key != 'hostname' and hostname is not None:
-                newName = newName.replace('hostname', hostname)
+            specified = groupNames.get(key)
+            if specified is None:
+                newName, isBool = self._specify_group_name(key, hostname)
 
-            newName = newName.replace('servicename', servicename)
+                # the keys of all fragments share the same (interned) str objects
+                specified = groupNames[key] = (sys.intern(newName), isBool)
 
-            if 'BOOL' in key:
-                if dataRegexMatches[key] is None:
-                    dataRegexMatches[key] = False
-                else:
-                    dataRegexMatches[key] = True
+            newName, isBool = specified
 
-            keySplit = newName.split('_')
-            for toBeRemoved in ('hostname', 'BOOL'):
-                try:
-                    keySplit.remove(toBeRemoved)
-                except ValueError as e:
-                    pass
-            newName = '_'.join(keySplit)
+            if isBool:
+                value = value is not None
 
-            newDataRegexMatches[newName] = dataRegexMatches[key]
+            newDataRegexMatches[newName] = value
 
         return newDataRegexMatches
 
+    def _specify_group_name(self, key: str, hostname: str) -> Tuple[str, bool]:
+        """Return the specified name of a regex group and whether its value is a BOOL."""
+        newName = key
+        servicename = self.__class__.__name__.lower()
+
+        if key != 'hostname' and hostname is not None:
+            newName = newName.replace('hostname', hostname)
+
+        newName = newName.replace('servicename', servicename)
+
+        keySplit = newName.split('_')
+        for toBeRemoved in ('hostname', 'BOOL'):
+            try:
+                keySplit.remove(toBeRemoved)
+            except ValueError as e:
+                pass
+        newName = '_'.join(keySplit)
+
+        return newName, 'BOOL' in key
+
     def _edit_results(self, results: dict) -> None:
         """
         Provide a way for the user to edit the generated result dict.
@@ -151,7 +317,25 @@ class PluginBase(IPlugin, metaclass=abc.ABCMeta):
         pass
 
     def gather_data(self, line: str, preRegexMatches: dict) -> tuple:
-        for regex, flags in self._dataRegex:
+        return self._gather_data(line, preRegexMatches, self._dataRegex, self._dataConverters)
+
+    def gather_data_bytes(self, line: bytes, preRegexMatches: dict) -> tuple:
+        if self._dataRegexBytes is None:
+            return self.gather_data(line.decode('utf-8', errors='replace'), preRegexMatches)
+
+        # only the captured groups are decoded
+        return self._gather_data(line, preRegexMatches, self._dataRegexBytes, self._dataConvertersBytes)
+
+    def _gather_data(self, line: object, preRegexMatches: dict, dataRegex: list, dataConverters: list) -> tuple:
+        """Extract the data from a str or bytes logline using the given data regexps and converters."""
+        if self._adaptiveDataRegex:
+            self._gatherCounter += 1
+
+            if self._gatherCounter % self.__reorderInterval == 0:
+                self._reorder_data_regex()
+
+        for index in self._dataRegexOrder:
+            regex, flags = dataRegex[index]
             search = regex.search(line)
 
             # if we did not match or every match is None
@@ -159,26 +343,14 @@ class PluginBase(IPlugin, metaclass=abc.ABCMeta):
             if search is None:
                 continue
 
-            # remove leading and trailing whitspaces from values
-            def strip(v: str) -> str:
-                if isinstance(v, str):
-                    return v.strip()
-                else:
-                    return v
-
-            def le(input: str) -> object:
-                try:
-                    # try interpreting the string as a type
-                    return literal_eval(input)
-                except Exception as e:
-                    # if we fail, then we will simply return the original input
-                    return input
-
-            result = {key: le(strip(value)) for key, value in search.groupdict().items()}
+            groups = search.groupdict()
+            result = {group: convert(groups[group]) for group, convert in dataConverters[index]}
 
             if not any(v is not None for v in result.values()):
                 continue
 
+            self._dataRegexHits[index] += 1
+
             self._edit_results(result)
             return True, flags, self._specify_regex_group_name(result, preRegexMatches)
 
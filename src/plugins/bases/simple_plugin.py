@@ -1,5 +1,7 @@
 """Module which contains the base plugin for all mail-aggregation plugins."""
 
+from typing import Tuple
+
 from .plugin_base import PluginBase
 
 
@@ -10,13 +12,7 @@ class SimplePlugin(PluginBase):
     def _format_hostname(hostname: str) -> str:
         return hostname.replace('-', '')
 
-    def _specify_regex_group_name(self, dataRegexMatches: dict, preRegexMatches: dict) -> dict:
-        newDataRegexMatches = {}
-
-        hostname = self._format_hostname(preRegexMatches.get('hostname'))
-        for key, value in dataRegexMatches.items():
-            newKey = key.replace('hostname', hostname)
-            newDataRegexMatches[newKey] = value
-
-        return newDataRegexMatches
+    def _specify_group_name(self, key: str, hostname: str) -> Tuple[str, bool]:
+        # only the hostname is replaced, eg. hostname_qid --> phdmxin_qid
+        return key.replace('hostname', self._format_hostname(hostname)), False
 
@@ -1,6 +1,9 @@
 """This Module contains all interfaces used for the plugins."""
 
 from abc import ABCMeta, abstractmethod
+from typing import List
+
+from ..containers.fragment import Fragment
 
 
 class IAbstractPlugin():
@@ -27,6 +30,50 @@ class IPlugin(IAbstractPlugin, metaclass=ABCMeta):
         pass
 
 
+class IBytesPlugin(metaclass=ABCMeta):
+    """
+    A data collection plugin which can process undecoded loglines (bytes).
+
+    In bytes mode the PluginManager gives undecoded loglines to those plugins,
+    so that a logline only needs to be decoded if a plugin subscribed to it.
+    The dicts returned by gather_data_bytes have to contain decoded values.
+
+    Plugins which do not implement this interface receive the decoded logline.
+    """
+
+    @abstractmethod
+    def check_subscription_bytes(self, line: bytes) -> bool:
+        """Return True or False if the subscription regex matched or not."""
+        pass
+
+    @abstractmethod
+    def gather_data_bytes(self, line: bytes, preRegexMatches: dict) -> tuple:
+        """Extract the data from an undecoded logline, same as IPlugin.gather_data."""
+        pass
+
+
+class IServiceSubscriber(metaclass=ABCMeta):
+    """
+    A data collection plugin which only processes loglines of specific services.
+
+    The service is the syslog program tag of a logline, eg.:
+
+    2017-03-28T17:00:00+02:00 phd-mxin postfix/smtpd[7418]: 3vsvFX3g9yzQLg: client=...
+                                       └────┬──────┘
+                                         service
+
+    The PluginManager uses the subscribed services to dispatch a logline
+    only to the plugins interested in it. check_subscription is still
+    called for those plugins.
+    """
+
+    @property
+    @abstractmethod
+    def subscribedServices(self) -> List[str]:
+        """Return a list of the subscribed services or None to subscribe to all services."""
+        pass
+
+
 class IProcessorPlugin(IAbstractPlugin, metaclass=ABCMeta):
     """
     Interface of a processor plugin.
@@ -91,7 +138,7 @@ class IDataContainer(IAbstractPlugin, metaclass=ABCMeta):
         pass
 
     @abstractmethod
-    def add_fragment(self, data: dict) -> None:
+    def add_fragment(self, data: Fragment) -> None:
         """Add data to the container."""
         pass
 
@@ -99,3 +146,45 @@ class IDataContainer(IAbstractPlugin, metaclass=ABCMeta):
     def build_final(self) -> None:
         """Aggregate data into final lists and check the data integrity at the same time."""
         pass
+
+
+class IMergeable(metaclass=ABCMeta):
+    """
+    The data of this IDataContainer can be collected by multiple
+    instances (eg. in different processes) and merged back together.
+
+    The parser uses this to process a logfile in parallel shards,
+    each shard is processed by its own set of containers and the
+    collected data is then merged into the containers of the main
+    process before build_final is called.
+    """
+
+    @abstractmethod
+    def get_mergeable_data(self) -> object:
+        """Get the collected data, it has to be picklable."""
+        pass
+
+    @abstractmethod
+    def merge(self, data: object) -> None:
+        """
+        Merge data returned by get_mergeable_data of another instance into self.
+
+        Data is merged in the order of the logfile, meaning that 'data'
+        was collected from loglines which come after the ones already
+        present in this container.
+        """
+        pass
+
+
+class IFlushable(metaclass=ABCMeta):
+    """
+    This IDataContainer can store the data which is ready while the
+    logfile is still being processed (eg. when the parser follows a logfile).
+
+    The data which is not ready yet is kept until the next flush or build_final.
+    """
+
+    @abstractmethod
+    def flush(self) -> None:
+        """Aggregate and store the data which is ready."""
+        pass
@@ -5,7 +5,7 @@
 import inspect
 import os
 import sys
-from typing import List
+from typing import List, Tuple, Callable
 
 # for an explanation please refer to the comments in __loadPlugin
 if sys.version_info[1] < 5:
@@ -14,7 +14,7 @@ else:
     import importlib
     import importlib.util
 
-# used for the pre regex
+# used for the service regex
 import re
 from typing import cast
 
@@ -23,13 +23,16 @@ from os.path import split as path_split
 from os.path import sep as path_sep
 
 from ..containers.data_receiver import DataReceiver
-from .interfaces import IAbstractPlugin, IPlugin, IProcessorPlugin, IDataContainer
+from ..containers.fragment import Fragment
+from .interfaces import IAbstractPlugin, IPlugin, IProcessorPlugin, IDataContainer, IServiceSubscriber, \
+                        IBytesPlugin
 from .bases.plugin_base import PluginBase
 from .bases.simple_plugin import SimplePlugin
 from .bases.plugin_processor import BaseVerifyProcessor
 from .plugin_collections import PluginAssociator, PluginData
 from .chain import Chain
 from ..exceptions import print_exception
+from ..parser.header import HeaderParser
 
 # used in annotation
 from ..config import Config
@@ -48,15 +51,28 @@ class PluginManager():
         IDataContainer
     ]
 
+    # extracts the syslog program tag (service) of a logline, eg.:
+    # ... phd-mxin postfix/smtpd[7418]: 3vsvFX3g9yzQLg: client=...
+    #              └────┬──────┘
+    #                service
+    __serviceRegex = re.compile(r'\s(?P<service>[^\s\[\]:]+)(\[\d+\])?:\s')
+    __serviceRegexBytes = re.compile(__serviceRegex.pattern.encode('utf-8'))
+
     def __init__(self, absPluginsPath: str):
         """"Constructor of PluginManager."""
-        self.__limitHosts = Config().get('limit_hosts')
-        if self.__limitHosts is None:
-            self.__limitHosts = []
+        limitHosts = Config().get('limit_hosts')
+        if limitHosts is None:
+            limitHosts = []
 
-        # This regex is used to extract generic information from each
+        # This parser is used to extract generic information from each
         # log line: currently: datetime and hostname
-        self.__preRegex = re.compile(cast(str, Config().get('preregex')))
+        self.__headerParser = HeaderParser(
+            cast(str, Config().get('preregex')),
+            limitHosts,
+            Config().get('iso8601_header') is True)
+
+        # cache: service -> data collection plugins subscribed to it
+        self.__pluginsByService = {}
 
         self._pluginAssociator = PluginAssociator(self)
 
@@ -70,6 +86,11 @@ class PluginManager():
             cast(List[IDataContainer], self._pluginAssociator.get_collection(IDataContainer).plugins)
         )
 
+    @property
+    def headerParser(self) -> HeaderParser:
+        """Return the parser which extracts the header (datetime, hostname) of the loglines."""
+        return self.__headerParser
+
     def _load_plugins(self, absPluginsPath: str) -> None:
         """Load all plugins found in the _plugins-enabled folder and its subfolders."""
         pluginClasses = []
@@ -141,6 +162,32 @@ class PluginManager():
             self._pluginAssociator.add_plugin(PluginData(foldername, filename, cls))
 
 
+    def _get_plugins_of_service(self, service: str) -> List[Tuple[str, IPlugin]]:
+        """
+        Return the data collection plugins which subscribed to a given service.
+
+        Plugins which do not implement IServiceSubscriber (or subscribed to None)
+        receive the loglines of all services. The result is cached, so that
+        dispatching a logline only needs one dict lookup.
+        """
+        plugins = self.__pluginsByService.get(service)
+
+        if plugins is None:
+            plugins = []
+
+            # again: IPlugin is polymorphic to IAbstractPlugin
+            for folderName, plugin in self._pluginAssociator.get_collection(IPlugin).plugins:
+                services = None
+                if isinstance(plugin, IServiceSubscriber):
+                    services = plugin.subscribedServices
+
+                if services is None or service in services:
+                    plugins.append((folderName, plugin))
+
+            self.__pluginsByService[service] = plugins
+
+        return plugins
+
     def get_chain_with_responsibility(self, responsibility: str) -> Chain:
         for c in cast(List[Chain], self._pluginAssociator.get_collection(IProcessorPlugin).plugins):
             if c.responsibility == responsibility:
@@ -153,38 +200,89 @@ class PluginManager():
         """Extract data from one logline."""
         folderToData = {}
 
-        pre = self.__preRegex.search(line)
+        # this also rejects loglines from hosts which are not in limit_hosts
+        pre = self.__headerParser.parse(line)
 
         if pre is None:
-            # pre = {}
             return
-        else:
-            pre = pre.groupdict()
 
-        hostname = pre.get('hostname')
-        if hostname is not None and hostname not in self.__limitHosts or hostname is None:
+        service = self.__serviceRegex.search(line)
+        if service is not None:
+            service = service.group('service')
+
+        plugins = self._get_plugins_of_service(service)
+        if len(plugins) == 0:
+            # no plugin is interested in this service
             return
 
-        # again: IPlugin is polymorphic to IAbstractPlugin
-        for folderName, plugin in self._pluginAssociator.get_collection(IPlugin).plugins:
+        for folderName, plugin in plugins:
             if plugin.check_subscription(line):
-                if folderToData.get(folderName) is None:
-                    folderToData[folderName] = {
-                        'pregexdata': pre,
-                        'data': [],
-                        'raw_logline': line
-                    }
-
-                try:
-                    data = plugin.gather_data(line, pre)
-                except Exception as e:
-                    print_exception(
-                        e,
-                        "Gathering data from logfile line using plugin: " + plugin.__class__.__name__,
-                        "Continue with next plugin",
-                        description="You may need to check the mentioned plugin for errors")
+                self.__gather_data(folderToData, folderName, plugin.gather_data, line, pre, line)
+
+        self.dataReceiver.add_info(folderToData)
+
+    def process_line_bytes(self, line: bytes) -> None:
+        """
+        Extract data from one undecoded logline.
+
+        The logline is only decoded when a plugin subscribed to it. Plugins
+        implementing IBytesPlugin apply their regexps directly to the bytes
+        and only decode the captured groups.
+        """
+        folderToData = {}
+
+        pre = self.__headerParser.parse_bytes(line)
+
+        if pre is None:
+            return
+
+        service = self.__serviceRegexBytes.search(line)
+        if service is not None:
+            service = service.group('service').decode('utf-8', errors='replace')
+
+        plugins = self._get_plugins_of_service(service)
+        if len(plugins) == 0:
+            return
+
+        decodedLine = None
+
+        for folderName, plugin in plugins:
+            if isinstance(plugin, IBytesPlugin):
+                if not plugin.check_subscription_bytes(line):
                     continue
-                else:
-                    folderToData[folderName]['data'].append(data)
+
+                if decodedLine is None:
+                    decodedLine = line.decode('utf-8', errors='replace')
+
+                self.__gather_data(folderToData, folderName, plugin.gather_data_bytes, line, pre, decodedLine)
+            else:
+                if decodedLine is None:
+                    decodedLine = line.decode('utf-8', errors='replace')
+
+                if plugin.check_subscription(decodedLine):
+                    self.__gather_data(folderToData, folderName, plugin.gather_data, decodedLine, pre, decodedLine)
 
         self.dataReceiver.add_info(folderToData)
+
+    def __gather_data(self,
+                      folderToData: dict,
+                      folderName: str,
+                      gather_data: Callable[[object, dict], tuple],
+                      line: object,
+                      pre: dict,
+                      rawLogline: str) -> None:
+        """Gather the data of a logline using a plugin and add it to folderToData."""
+        fragment = folderToData.get(folderName)
+        if fragment is None:
+            fragment = folderToData[folderName] = Fragment(pre, [], rawLogline)
+
+        try:
+            data = gather_data(line, pre)
+        except Exception as e:
+            print_exception(
+                e,
+                "Gathering data from logfile line using plugin: " + gather_data.__self__.__class__.__name__,
+                "Continue with next plugin",
+                description="You may need to check the mentioned plugin for errors")
+        else:
+            fragment.data.append(data)
@@ -0,0 +1,87 @@
+"""Module which contains the BulkWriter."""
+
+from typing import List
+
+from .interfaces import IRepository
+from .misc import SearchScope, value_matches
+from ..exceptions import print_warning
+
+
+class BulkWriter():
+    """
+    Buffer the objects to store and write them in batches (IRepository.insert_or_update_many).
+
+    A batch is written as soon as 'batchSize' objects of one scope are
+    buffered and when flush() is called. The batches are unordered, so an
+    object which cannot be written does not prevent the others from being
+    written; the errors are reported per batch.
+
+    Objects which are deleted from the repository while they are still
+    buffered have to be discarded using discard().
+    """
+
+    # number of reported errors per batch
+    __maxReportedErrors = 3
+
+    def __init__(self, repository: IRepository, batchSize: int = 1000):
+        """Constructor of BulkWriter."""
+        self.__repository = repository
+        self.__batchSize = max(1, batchSize)
+        self.__buffers = {SearchScope.COMPLETE: [], SearchScope.INCOMPLETE: []}
+
+        self.__writtenObjects = 0
+        self.__failedObjects = 0
+
+    @property
+    def writtenObjects(self) -> int:
+        """Return the number of objects which were written."""
+        return self.__writtenObjects
+
+    @property
+    def failedObjects(self) -> int:
+        """Return the number of objects which could not be written."""
+        return self.__failedObjects
+
+    def write(self, data: dict, scope: SearchScope) -> None:
+        """Buffer an object to insert or update in the scope (COMPLETE or INCOMPLETE)."""
+        if scope == SearchScope.ALL:
+            raise NotImplementedError()
+
+        buffer = self.__buffers[scope]
+        buffer.append(data)
+
+        if len(buffer) >= self.__batchSize:
+            self.__write_batch(scope)
+
+    def discard(self, key: str, value: object, scope: SearchScope) -> None:
+        """Remove the buffered objects whose value for the key matches (like IRepository.delete)."""
+        scopes = [SearchScope.COMPLETE, SearchScope.INCOMPLETE] if scope == SearchScope.ALL else [scope]
+
+        for oneScope in scopes:
+            self.__buffers[oneScope] = [data for data in self.__buffers[oneScope]
+                                        if not value_matches(data.get(key), value)]
+
+    def __write_batch(self, scope: SearchScope) -> None:
+        batch = self.__buffers[scope]
+        if len(batch) == 0:
+            return
+
+        self.__buffers[scope] = []
+
+        errors = self.__repository.insert_or_update_many(batch, scope)
+
+        self.__writtenObjects += len(batch) - len(errors)
+        self.__failedObjects += len(errors)
+
+        if len(errors) > 0:
+            print_warning('Could not store %d of %d %s mails: %s' % (
+                len(errors),
+                len(batch),
+                scope.name.lower(),
+                '; '.join(errors[:self.__maxReportedErrors])
+            ))
+
+    def flush(self) -> None:
+        """Write all buffered objects."""
+        for scope in self.__buffers:
+            self.__write_batch(scope)
@@ -70,6 +70,21 @@ class IRepository(metaclass=ABCMeta):
         """
         pass
 
+    @abstractmethod
+    def find_batch(self, key: str, values: List[str], scope: SearchScope) -> CountableIterator[Dict]:
+        """
+        R: Read (many values at once)
+
+        Return all objects whose 'key' equals one of the 'values' (or, if the
+        key holds a list, contains one of them). In case of mongodb this is
+        a single query using $in.
+
+        This replaces one find() per value when the parser looks up the
+        already stored parts of many mails at once. Supply the results with
+        the same metadata as in find().
+        """
+        pass
+
     @abstractmethod
     def count_specific_fields(self, expression: Expression, field: str, separator: str = None) -> CountableIterator:
         """
@@ -115,6 +130,28 @@ class IRepository(metaclass=ABCMeta):
         storage backend for the data provided. (Although this is
         discouraged, as the framework also makes use of the remove_metadata
         method)
+
+        If the data was supplied with an identifier using set_identifier, it
+        has to be inserted if it does not exist yet (upsert), so that the
+        client can write it without searching it first.
+        """
+        pass
+
+    @abstractmethod
+    def insert_or_update_many(self, data: List[dict], scope: SearchScope) -> List[str]:
+        """
+        C: Create
+        or
+        U: Update (many objects at once)
+
+        Same as insert_or_update but for a batch of objects, which should
+        be written in as few operations as possible. In case of mongodb
+        this is an unordered bulk_write with an InsertOne for each new
+        object and a ReplaceOne (upsert) for each object which contains an '_id'.
+
+        Unordered means that an object which cannot be written does not
+        prevent the others from being written. Return the error messages
+        of the objects which could not be written (empty if all were written).
         """
         pass
 
@@ -143,6 +180,18 @@ class IRepository(metaclass=ABCMeta):
         """
         pass
 
+    @abstractmethod
+    def set_identifier(self, data: dict, identifier: str) -> None:
+        """
+        Supply data with a deterministic identifier.
+
+        The identifier is derived from the data itself (eg. the queue id of
+        a mail), so the same data always gets the same identifier. In case
+        of mongodb it is used as '_id', so insert_or_update replaces the
+        stored data with the same identifier or inserts it (upsert).
+        """
+        pass
+
     @abstractmethod
     def save_position_of_last_read_byte(self, pos: int) -> None:
         """
@@ -161,6 +210,23 @@ class IRepository(metaclass=ABCMeta):
         """
         pass
 
+    @abstractmethod
+    def save_fingerprint_of_last_read_line(self, fingerprint: str) -> None:
+        """
+        Save the fingerprint of the last read line in the storage backend.
+
+        The parser uses it to verify that the logfile still contains this
+        line right before the position of the last read byte when resuming.
+        """
+        pass
+
+    @abstractmethod
+    def get_fingerprint_of_last_read_line(self) -> str:
+        """
+        Return the fingerprint of the last read line (None if there is none).
+        """
+        pass
+
     @abstractmethod
     def save_size_of_last_logfile(self, pos: int) -> None:
         """
@@ -178,6 +244,39 @@ class IRepository(metaclass=ABCMeta):
         """
         pass
 
+    @abstractmethod
+    def save_identity_of_last_logfile(self, identity: dict) -> None:
+        """
+        Save the identity of the last read local logfile (inode, size and fingerprint of its head).
+
+        The manager uses it to detect whether the local logfile was rotated.
+        """
+        pass
+
+    @abstractmethod
+    def get_identity_of_last_logfile(self) -> dict:
+        """
+        Return the identity of the last read local logfile (None if there is none).
+        """
+        pass
+
+    @abstractmethod
+    def save_version_of_stored_data(self, version: int) -> None:
+        """
+        Save the version of the format of the stored objects.
+
+        The containers use it to migrate the objects stored by an older
+        version of tamandua only once (eg. add a field which is looked up).
+        """
+        pass
+
+    @abstractmethod
+    def get_version_of_stored_data(self) -> int:
+        """
+        Return the version of the format of the stored objects (0 if none was saved).
+        """
+        pass
+
     @abstractmethod
     def get_all_keys(self, force=False) -> List[str]:
         """
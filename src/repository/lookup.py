@@ -0,0 +1,136 @@
+"""Module which contains the LookupTable."""
+
+import copy
+from typing import List, Iterable, Iterator, Callable
+
+from .interfaces import IRepository
+from .misc import SearchScope, value_matches
+from ..expression.builder import ExpressionBuilder, ExpressionField, Comparator
+
+
+class LookupTable():
+    """
+    In-run lookup table of the objects in the repository by the values of some keys.
+
+    Instead of one query per value, the objects are fetched with one
+    query per key and scope (IRepository.find_batch) and looked up in
+    memory afterwards. Values which were not fetched beforehand are
+    queried one by one as usual.
+
+    Objects which are stored in or deleted from the repository while the
+    table is used have to be registered using add() and remove(), so that
+    the table stays consistent with the repository. If the objects are
+    written buffered (see BulkWriter), 'flush' is called before the
+    repository is queried.
+    """
+
+    # maximum number of values per query
+    __batchSize = 10000
+
+    def __init__(self, repository: IRepository, keys: List[str], flush: Callable[[], None] = None):
+        """Constructor of LookupTable."""
+        self.__repository = repository
+        self.__keys = keys
+        self.__flush = flush
+
+        # scope -> _id -> object
+        self.__objects = {SearchScope.COMPLETE: {}, SearchScope.INCOMPLETE: {}}
+        # scope -> key -> value -> _id (in the order of insertion)
+        self.__index = {scope: {key: {} for key in keys} for scope in self.__objects}
+        # key -> values which were fetched
+        self.__fetched = {key: set() for key in keys}
+
+    @staticmethod
+    def __scopes(scope: SearchScope) -> List[SearchScope]:
+        if scope == SearchScope.ALL:
+            return [SearchScope.COMPLETE, SearchScope.INCOMPLETE]
+
+        return [scope]
+
+    def __add_to_index(self, obj: dict, scope: SearchScope) -> None:
+        objId = obj.get('_id', id(obj))
+        if objId in self.__objects[scope]:
+            return
+
+        self.__objects[scope][objId] = obj
+
+        for key in self.__keys:
+            values = obj.get(key)
+            if not isinstance(values, list):
+                values = [values]
+
+            for value in values:
+                if isinstance(value, str):
+                    self.__index[scope][key].setdefault(value, {})[objId] = None
+
+    def __remove_from_index(self, objId: object, scope: SearchScope) -> None:
+        obj = self.__objects[scope].pop(objId)
+
+        for key in self.__keys:
+            values = obj.get(key)
+            if not isinstance(values, list):
+                values = [values]
+
+            for value in values:
+                ids = self.__index[scope][key].get(value) if isinstance(value, str) else None
+                if ids is not None:
+                    ids.pop(objId, None)
+
+    def prefetch(self, key: str, values: Iterable[str]) -> None:
+        """Fetch all objects of all scopes having one of the values for the key."""
+        values = [value for value in set(values) if value not in self.__fetched[key]]
+
+        if len(values) > 0 and self.__flush is not None:
+            self.__flush()
+
+        for start in range(0, len(values), self.__batchSize):
+            batch = values[start:start + self.__batchSize]
+
+            for scope in self.__objects:
+                for obj in self.__repository.find_batch(key, batch, scope):
+                    self.__add_to_index(obj, scope)
+
+            self.__fetched[key].update(batch)
+
+    def find(self, key: str, value: object, scope: SearchScope) -> List[dict]:
+        """Return copies of the objects whose value for the key matches."""
+        if not isinstance(value, str) or value not in self.__fetched.get(key, ()):
+            if self.__flush is not None:
+                self.__flush()
+
+            builder = ExpressionBuilder()
+            builder.add_field(ExpressionField(key, str(value), Comparator.equal))
+
+            results = []
+            for oneScope in self.__scopes(scope):
+                results.extend(self.__repository.find(builder.expression, oneScope))
+
+            return results
+
+        results = []
+        for oneScope in self.__scopes(scope):
+            for objId in self.__index[oneScope][key].get(value, ()):
+                results.append(copy.deepcopy(self.__objects[oneScope][objId]))
+
+        return results
+
+    def objects(self) -> Iterator[dict]:
+        """Return the objects in the table (not copied, must not be modified)."""
+        for objects in self.__objects.values():
+            yield from objects.values()
+
+    def add(self, obj: dict, scope: SearchScope) -> None:
+        """Register an object which was stored in the repository."""
+        self.__add_to_index(copy.deepcopy(obj), scope)
+
+    def remove(self, key: str, value: object, scope: SearchScope) -> None:
+        """Register that the objects whose value for the key matches were deleted from the repository."""
+        for oneScope in self.__scopes(scope):
+            if isinstance(value, str) and key in self.__keys:
+                toRemove = list(self.__index[oneScope][key].get(value, ()))
+            else:
+                toRemove = [objId for objId, obj in self.__objects[oneScope].items()
+                            if value_matches(obj.get(key), value)]
+
+            for objId in toRemove:
+                self.__remove_from_index(objId, oneScope)
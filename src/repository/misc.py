@@ -47,3 +47,8 @@ class CountableIterator(Generic[T]):
     def __len__(self):
         """Count iterator using the given count function."""
         return self.__len_counter(self.__data)
+
+
+def value_matches(objectValue: object, value: object) -> bool:
+    """Check whether the value of a stored object matches the searched value (like in a query)."""
+    return objectValue == value or (isinstance(objectValue, list) and value in objectValue)
@@ -1,7 +1,7 @@
 """Module which contains the repository implementation for mongodb."""
 
 import itertools
-from pymongo import MongoClient, IndexModel, ASCENDING, DESCENDING
+from pymongo import MongoClient, IndexModel, ASCENDING, DESCENDING, InsertOne, ReplaceOne
 from pymongo.collection import Collection as PyMongoCollection
 import pymongo.errors as pymongo_errors
 import re
@@ -59,6 +59,9 @@ class MongoRepository(IRepository):
     # in the metadata collection
     __lastBytePosName = 'lastbytepos'
     __lastLogfileSizeName = 'lastlogfilesize'
+    __lastLineFingerprintName = 'lastlinefingerprint'
+    __lastLogfileIdentityName = 'lastlogfileidentity'
+    __storedDataVersionName = 'storeddataversion'
     __lastRunDateTimeName = 'lastrundatetime'
 
     # map different comparators to the mongodb
@@ -258,6 +261,15 @@ class MongoRepository(IRepository):
         results = searchCollection.find(q)
         return CountableIterator(results, lambda x: x.count())
 
+    def find_batch(self, key: str, values: List[str], scope: SearchScope) -> CountableIterator[Dict]:
+        try:
+            searchCollection = self.__resolveScope(scope)
+        except TargetCollectionNotFound as e:
+            return CountableIterator(iter([]), lambda x: 0)
+
+        results = searchCollection.find({key: {'$in': list(values)}})
+        return CountableIterator(results, lambda x: x.count())
+
     def count_specific_fields(self, expression: Expression, field: str, separator: str = None) -> CountableIterator:
         fieldExp = '$' + field
 
@@ -311,12 +323,35 @@ class MongoRepository(IRepository):
         collection = self.__resolveScope(scope)
 
         if data.get('_id') is not None:
-            collection.update({
+            collection.replace_one({
                 '_id': data['_id']
-            }, data)
+            }, data, upsert=True)
         else:
             collection.insert_one(data)
 
+    def insert_or_update_many(self, data: List[dict], scope: SearchScope) -> List[str]:
+        if scope == SearchScope.ALL:
+            raise NotImplementedError()
+
+        if len(data) == 0:
+            return []
+
+        collection = self.__resolveScope(scope)
+
+        operations = []
+        for d in data:
+            if d.get('_id') is not None:
+                operations.append(ReplaceOne({'_id': d['_id']}, d, upsert=True))
+            else:
+                operations.append(InsertOne(d))
+
+        try:
+            collection.bulk_write(operations, ordered=False)
+        except pymongo_errors.BulkWriteError as e:
+            return [error.get('errmsg', str(error)) for error in e.details.get('writeErrors', [])]
+
+        return []
+
     def delete(self, query: Expression, scope: SearchScope) -> None:
         collection = self.__resolveScope(scope)
         collection.remove(self._parse_expression(query))
@@ -327,6 +362,9 @@ class MongoRepository(IRepository):
         except KeyError as e:
             pass
 
+    def set_identifier(self, data: dict, identifier: str) -> None:
+        data['_id'] = identifier
+
     def __get_metadata(self, field: str) -> dict:
         return self._collection_metadata.find_one({field: {'$exists': True}})
 
@@ -352,12 +390,30 @@ class MongoRepository(IRepository):
     def get_position_of_last_read_byte(self) -> int:
         return self.__get_metadata_wrapp(self.__lastBytePosName, 0)
 
+    def save_fingerprint_of_last_read_line(self, fingerprint: str) -> None:
+        self.__save_metadata(self.__lastLineFingerprintName, fingerprint)
+
+    def get_fingerprint_of_last_read_line(self) -> str:
+        return self.__get_metadata_wrapp(self.__lastLineFingerprintName, None)
+
     def save_size_of_last_logfile(self, size: int) -> None:
         self.__save_metadata(self.__lastLogfileSizeName, size)
 
     def get_size_of_last_logfile(self) -> int:
         return self.__get_metadata_wrapp(self.__lastLogfileSizeName, 0)
 
+    def save_identity_of_last_logfile(self, identity: dict) -> None:
+        self.__save_metadata(self.__lastLogfileIdentityName, identity)
+
+    def get_identity_of_last_logfile(self) -> dict:
+        return self.__get_metadata_wrapp(self.__lastLogfileIdentityName, None)
+
+    def save_version_of_stored_data(self, version: int) -> None:
+        self.__save_metadata(self.__storedDataVersionName, version)
+
+    def get_version_of_stored_data(self) -> int:
+        return self.__get_metadata_wrapp(self.__storedDataVersionName, 0)
+
     def get_all_keys(self, force=False) -> List[str]:
         resultCollectionName = 'all_keys'
 
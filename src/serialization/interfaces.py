@@ -12,6 +12,11 @@ class ISerializable(metaclass=ABCMeta):
         """Get the data which should be serialized."""
         pass
 
+    @abstractmethod
+    def restore_serialized_data(self, data: object) -> None:
+        """Restore the data returned by get_serializable_data (eg. in the next run)."""
+        pass
+
 
 class ISerializationMethod(metaclass=ABCMeta):
     """Every serialization method has to implement this interface, eg. JSON or PyObjStore."""
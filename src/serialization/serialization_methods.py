@@ -1,7 +1,9 @@
 """Module with a serialization methods available."""
 
+import os
 import json
 import pickle
+from typing import Callable, IO
 
 from .interfaces import ISerializationMethod
 
@@ -12,14 +14,28 @@ class BaseSerialization(ISerializationMethod):
     def __init__(self, path: str):
         self.path = path
 
+    def _save_atomically(self, mode: str, dump: Callable[[IO], None]) -> None:
+        """
+        Write the file using 'dump' into a temporary file and replace the file with it.
+
+        This way a crash while writing does not leave a corrupt file behind.
+        """
+        tmppath = self.path + '.tmp'
+
+        with open(tmppath, mode) as f:
+            dump(f)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmppath, self.path)
+
 
 class JSONSerialization(BaseSerialization):
     """Serializes data to and from JSON."""
 
     def save(self, data: object) -> None:
         """Serialize data."""
-        with open(self.path, 'w') as f:
-            json.dump(data, f)
+        self._save_atomically('w', lambda f: json.dump(data, f))
 
     def load(self) -> object:
         """Deserialize data and return it."""
@@ -32,8 +48,7 @@ class PickleSerialization(BaseSerialization):
 
     def save(self, data: object) -> None:
         """Serialize data."""
-        with open(self.path, 'wb') as f:
-            pickle.dump(data, f)
+        self._save_atomically('wb', lambda f: pickle.dump(data, f))
 
     def load(self) -> object:
         """Deserialize data and return it."""
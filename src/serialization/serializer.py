@@ -23,3 +23,13 @@ class Serializer():
     def load(self) -> object:
         """Deserialize data and return it."""
         return self._serializer.load()
+
+    def restore(self, dataReceiver: DataReceiver) -> None:
+        """Deserialize data and give it back to the IDataContainer s which stored it."""
+        map = self.load()
+
+        for cls in dataReceiver.get_conainers_of_type(ISerializable):
+            data = map.get(cls.__class__.__name__)
+
+            if data is not None:
+                cls.restore_serialized_data(data)
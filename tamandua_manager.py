@@ -14,12 +14,21 @@ if True: # noqa: E402
     import click
     from datetime import datetime, timedelta
     import subprocess
+    import hashlib
+    import re
+    import zlib
+    import io
+    import queue
+    import threading
+    from typing import Callable
 
     from src.repository.factory import RepositoryFactory
     from src.repository.misc import SearchScope
     from src.config import Config
     from src.constants import CONFIGFILE
     from src.expression.builder import ExpressionBuilder
+    from src.parser.reader import fingerprint, fingerprint_length, get_compression
+    from src.exceptions import print_warning
 
 
 Config().setup(
@@ -45,7 +54,7 @@ def exit_if_already_running():
 
 
 def run_remotesshwrapper_command(
-    command: str, args: list = [], stdout: object = subprocess.PIPE
+    command: str, args: list = [], stdout: object = subprocess.PIPE, stderr: object = None
 ) -> subprocess.Popen:
     return subprocess.Popen(
         [
@@ -59,21 +68,184 @@ def run_remotesshwrapper_command(
             command,
             ' '.join(args)
         ],
-        stdout=stdout
+        stdout=stdout,
+        stderr=stderr
     )
 
 
+def transfer_logfile_diff(start: int, length: int, write: Callable[[bytes], None]) -> bool:
+    """
+    Give 'length' bytes of the remote logfile starting at 'start' block by block to 'write'.
+
+    The loghost reads the range in large blocks and compresses it if
+    'transfer_compression' is set in the config (only 'gzip' is supported).
+    The loghost computes the sha1 checksum of the range in the same pipeline
+    and writes it to stderr. Return whether the checksum of the transferred
+    bytes matches it, raise an IOError if the transfer failed.
+    """
+    compression = Config().get('transfer_compression')
+    args = [str(start), str(length)]
+    decompressor = None
+
+    if compression is not None:
+        args.append(compression)
+        # gzip header and trailer
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    process = run_remotesshwrapper_command('tamandua', args=args, stderr=subprocess.PIPE)
+    checksum = hashlib.sha1()
+
+    try:
+        while True:
+            block = process.stdout.read(1 << 20)
+            if not block:
+                break
+
+            if decompressor is not None:
+                block = decompressor.decompress(block)
+
+            checksum.update(block)
+            write(block)
+
+        if decompressor is not None:
+            block = decompressor.flush()
+            checksum.update(block)
+            write(block)
+    except BaseException as e:
+        # eg. the stream was closed before the end of the transfer
+        process.kill()
+        process.wait()
+        raise
+
+    # the output of sha1sum ('<checksum>  -') and the error messages if any
+    remoteOutput = process.stderr.read().decode('utf-8', errors='replace')
+    process.wait()
+
+    if process.returncode != 0:
+        raise IOError('Transferring the logfile diff failed (exit code %d): %s' %
+                      (process.returncode, remoteOutput.strip()))
+
+    remoteChecksum = re.search(r'^([0-9a-f]{40})\s', remoteOutput, re.MULTILINE)
+    if remoteChecksum is None:
+        raise IOError('The loghost did not send the checksum of the logfile diff: %s' % remoteOutput.strip())
+
+    return checksum.hexdigest() == remoteChecksum.group(1)
+
+
+class TransferStream(io.RawIOBase):
+    """
+    Stream of the remote logfile diff, which is transferred in a separate thread.
+
+    At most 'bufferSize' blocks are buffered, so that the transfer waits
+    for the parser if it is behind. If the checksum of the transferred
+    bytes does not match, an IOError is raised at the end of the stream.
+    """
+
+    def __init__(self, start: int, length: int, bufferSize: int = 16):
+        """Constructor of TransferStream."""
+        self.__blocks = queue.Queue(bufferSize)
+        self.__block = memoryview(b'')
+        self.__stopped = False
+
+        self.__thread = threading.Thread(target=self.__transfer, args=(start, length), daemon=True)
+        self.__thread.start()
+
+    def __put(self, block: bytes) -> None:
+        """Buffer a block, wait if the buffer is full until the stream is closed."""
+        while True:
+            if self.__stopped:
+                raise IOError('The stream of the logfile diff was closed')
+
+            try:
+                self.__blocks.put(block, timeout=0.1)
+                return
+            except queue.Full as e:
+                continue
+
+    def __transfer(self, start: int, length: int) -> None:
+        try:
+            if transfer_logfile_diff(start, length, self.__put):
+                self.__blocks.put(None)
+            else:
+                self.__blocks.put(IOError('Checksum of the transferred logfile diff does not match'))
+        except Exception as e:
+            self.__blocks.put(e)
+
+    def readable(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        """Close the stream and abort the transfer if it is not finished."""
+        self.__stopped = True
+        super().close()
+
+    def readinto(self, buffer: bytearray) -> int:
+        while len(self.__block) == 0:
+            block = self.__blocks.get()
+
+            if block is None or isinstance(block, Exception):
+                # keep the end of the stream for further reads
+                self.__blocks.put(block)
+
+                if block is not None:
+                    raise block
+
+                return 0
+
+            self.__block = memoryview(block)
+
+        size = min(len(buffer), len(self.__block))
+        buffer[:size] = self.__block[:size]
+        self.__block = self.__block[size:]
+
+        return size
+
+
+def get_logfile_identity(path: str, headSize: int = 4096) -> dict:
+    """Return the inode, the size and the fingerprint of the head of a local logfile."""
+    with open(path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        head = f.read(min(stat.st_size, headSize))
+
+    return {
+        'inode': stat.st_ino,
+        'size': stat.st_size,
+        'head': fingerprint(head)
+    }
+
+
+def is_same_logfile(path: str, identity: dict, rotated: bool = False) -> bool:
+    """
+    Check whether the local logfile is (a grown version of) the logfile with the given identity.
+
+    A 'rotated' logfile may have been copied (copytruncate) or compressed by logrotate,
+    therefore its inode is not compared and, if it is compressed, neither its size.
+    """
+    try:
+        compression = get_compression(path)
+        openLogfile = open if compression is None else compression.open
+
+        with openLogfile(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            head = f.read(fingerprint_length(identity['head']))
+    except FileNotFoundError as e:
+        return False
+
+    if fingerprint(head) != identity['head']:
+        return False
+
+    if rotated:
+        return compression is not None or stat.st_size >= identity['size']
+
+    return stat.st_ino == identity['inode'] and stat.st_size >= identity['size']
+
+
 @atexit.register
 def remove_pid():
     global cleanupPID
     if cleanupPID:
         os.remove(pidfile)
 
-    try:
-        os.remove(os.path.join(BASEDIR, 'logfile'))
-    except FileNotFoundError:
-        pass
-
 
 @click.group()
 def cli():
@@ -84,9 +256,9 @@ def cli():
 @cli.command()
 def reset_logfile_pos():
     """Reset the reader position of the logfile to 0."""
-    RepositoryFactory                       \
-        .create_repository()                \
-        .save_position_of_last_read_byte(0)
+    repository = RepositoryFactory.create_repository()
+    repository.save_position_of_last_read_byte(0)
+    repository.save_fingerprint_of_last_read_line(None)
 
     print('Reset last logfile position to 0 successful.')
 
@@ -161,7 +333,6 @@ def run(ctx):
     """Get logfile and run the parser. This can be used within cronjobs."""
     repository = RepositoryFactory.create_repository()
 
-    logfilename = os.path.join(BASEDIR, 'logfile')
     lastlogfilesize = repository.get_size_of_last_logfile()
 
     process = run_remotesshwrapper_command('getmaillogsize')
@@ -184,26 +355,86 @@ def run(ctx):
         ctx.invoke(reset_logfile_pos)
         currByte = 0
 
-    with open(logfilename, 'wb') as f:
-        print('Start transferring logfile diff to local machine\n')
-        process = run_remotesshwrapper_command('tamandua', args=[str(currByte)], stdout=f)
-        process.wait()
+    # transfer the last processed line again, so that
+    # the parser can verify that it resumes at the right position
+    startByte = currByte
+    fingerprint = repository.get_fingerprint_of_last_read_line()
+    if fingerprint is not None:
+        startByte = max(0, currByte - fingerprint_length(fingerprint))
 
     from tamandua_parser import main as tamandua_main
     from tamandua_parser import DefaultArgs
 
     args = DefaultArgs()
-    args.logfile = logfilename
+    args.logfile = '<logfile diff>'
+    # the logfile may grow meanwhile, the rest is transferred in the next run.
+    # The diff is parsed while it is transferred
+    args.logstream = TransferStream(startByte, currlogfilesize - startByte)
+    # the logfile was replaced (eg. rotated) if the last processed line is not found
+    args.logstreamfromstart = lambda: TransferStream(0, currlogfilesize)
+    args.offset = startByte
     args.printmsgs = True
 
-    print('\nStart reading the logfile')
+    print('Start transferring and reading the logfile diff\n')
 
     tamandua_main(args)
     ctx.invoke(cleanup)
 
     repository.save_time_of_last_run(datetime.now())
 
-    os.remove(logfilename)
+
+@cli.command()
+@click.option('--logfile', help='Local logfile to parse', default='/var/log/mail.log', show_default=True)
+@click.pass_context
+def run_local(ctx, logfile):
+    """Run the parser on a local logfile. This can be used within cronjobs on the loghost."""
+    repository = RepositoryFactory.create_repository()
+    identity = repository.get_identity_of_last_logfile()
+
+    logfiles = [logfile]
+    resumefile = logfile
+
+    # the inode and the head of the logfile identify it, even if
+    # a new logfile already grew larger than the last one
+    if identity is not None and not is_same_logfile(logfile, identity):
+        # logrotate renames, copies (copytruncate) or compresses the last logfile
+        rotated = next((path for path in (logfile + '.1', logfile + '.1.gz')
+                        if is_same_logfile(path, identity, rotated=True)), None)
+
+        if rotated is not None:
+            print('Rotated logfile detected, finishing %s first.' % rotated)
+            logfiles = [rotated, logfile]
+            resumefile = rotated
+        else:
+            print_warning('The last logfile was not found as %s.1 or %s.1.gz, ' % (logfile, logfile) +
+                          'its loglines after the last read byte are not processed.')
+            print('New logfile detected, reading from beginning.')
+            ctx.invoke(reset_logfile_pos)
+
+    print('Position of last read byte: %d' % repository.get_position_of_last_read_byte())
+
+    # the head is already written, the logfile may only grow meanwhile
+    newIdentity = get_logfile_identity(logfile)
+
+    from tamandua_parser import main as tamandua_main
+    from tamandua_parser import DefaultArgs
+
+    args = DefaultArgs()
+    args.logfiles = logfiles
+    args.resumefile = resumefile
+    # the logfiles are complete, not diffs
+    args.offset = 0
+    args.printmsgs = True
+    args.mmap = True
+
+    print('Start reading the logfile\n')
+
+    tamandua_main(args)
+    ctx.invoke(cleanup)
+
+    repository.save_identity_of_last_logfile(newIdentity)
+    repository.save_size_of_last_logfile(newIdentity['size'])
+    repository.save_time_of_last_run(datetime.now())
 
 
 if __name__ == '__main__':
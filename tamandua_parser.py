@@ -8,9 +8,13 @@ This is the main (entry point) of the parser.
 
 import os
 import sys
+import time
+import glob
 import argparse
+from typing import Iterable, Callable, List
 
 BASEDIR = os.path.abspath(os.path.dirname(__file__))
+PLUGINSDIR = os.path.join(BASEDIR, 'plugins-enabled')
 sys.path.append(BASEDIR)
 
 # JSONDecodeError exists from python 3.5 and onwards
@@ -23,19 +27,152 @@ else:
 from src.plugins.plugin_manager import PluginManager
 from src.config import Config
 from src.constants import CONFIGFILE
-from src.exceptions import print_exception
+from src.exceptions import print_exception, print_warning
 from src.repository.factory import RepositoryFactory
+from src.parser.sharding import ShardedParser
+from src.parser.reader import LineReader, FileReader, MmapReader, CompressedReader, StreamReader, get_compression
+from src.parser.follow import LogFollower
+from src.parser.merge import TimestampMerger
+from src.parser.listener import SyslogListener
+from src.serialization.serializer import Serializer
 
 
 class DefaultArgs():
     logfile = os.path.join('mock_logs', 'extern-intern_to_intern.log')
+    # if set, these logfiles are processed instead of 'logfile'
+    logfiles = None
+    # if set, the lines of 'logfile' are read from this binary stream (eg. the output of a process)
+    logstream = None
+    # if set, returns the stream of the whole logfile, which is read instead of 'logstream'
+    # if the last processed line is not found in it (eg. the logfile was rotated)
+    logstreamfromstart = None
+    # if set, the saved position refers to this (complete) logfile instead of the last one
+    resumefile = None
+    # if set, the position is saved even if several logfiles are processed without a 'resumefile'
+    saveposition = False
     printdata = False
     printmsgs = False
+    workers = 1
+    # flags which are None are taken from the config (default: off)
+    bytesmode = None
+    mmap = None
+    streaming = None
+    streaming_window = None
+    follow = False
+    followinterval = 10
+    offset = None
+    decompressprocess = None
+    merge = None
+    listen = None
+    listenqueue = 1000
+    listenbatch = 100
     configfile = os.path.join(BASEDIR, CONFIGFILE)
 
 
+def process_lines(lines: Iterable, process_line: Callable[[object], None], printmsgs: bool) -> int:
+    """Give each line to 'process_line' and return the number of processed lines."""
+    linecounter = 0
+
+    for line in lines:
+        process_line(line)
+        linecounter += 1
+
+        if printmsgs:
+            sys.stdout.write('\rProcessed %d lines' % linecounter)
+            sys.stdout.flush()
+
+    return linecounter
+
+
+def order_logfiles(patterns: List[str]) -> List[str]:
+    """
+    Expand the glob patterns and return the logfiles in chronological order.
+
+    The logfiles are ordered by the time of their last modification,
+    which is the time of their last logline (eg. mail.log.2.gz, mail.log.1, mail.log).
+    """
+    logfiles = []
+
+    for pattern in patterns:
+        # a logfile which does not exist is reported when reading it
+        for logfile in sorted(glob.glob(pattern)) or [pattern]:
+            if logfile not in logfiles:
+                logfiles.append(logfile)
+
+    def modification_time(logfile: str) -> float:
+        try:
+            return os.path.getmtime(logfile)
+        except OSError as e:
+            return float('inf')
+
+    return sorted(logfiles, key=modification_time)
+
+
+def open_logfile(logfile: str, args: DefaultArgs) -> LineReader:
+    """Return the reader to use for the logfile."""
+    if get_compression(logfile) is not None:
+        if args.mmap or args.workers > 1:
+            print_warning('A compressed logfile is read by a single process without a memory map.')
+
+        return CompressedReader(logfile, args.decompressprocess)
+    elif args.mmap or args.workers > 1:
+        return MmapReader(logfile)
+    else:
+        return FileReader(logfile)
+
+
+def parse_logfile(reader: LineReader,
+                  args: DefaultArgs,
+                  pluginManager: PluginManager,
+                  process_line: Callable[[bytes], None],
+                  skip: int = 0,
+                  lastFingerprint: str = None) -> None:
+    """
+    Process all lines of the logfile opened by 'reader'.
+
+    The first 'skip' bytes are skipped if they end with the
+    line of 'lastFingerprint', which was processed in the last run.
+    """
+    with reader:
+        if skip > 0 and not reader.resume(skip, lastFingerprint):
+            print_warning('The last processed line was not found in the logfile, ' +
+                          'processing the whole logfile.')
+
+        if args.workers > 1 and isinstance(reader, MmapReader):
+            start = reader.offset
+            reader.skip_to_end()
+
+            shardedParser = ShardedParser(
+                pluginManager,
+                args.workers,
+                (args.configfile, BASEDIR, vars(args), PLUGINSDIR))
+            shardedParser.parse(reader.path, args.printmsgs, start, reader.offset)
+        else:
+            process_lines(reader, process_line, args.printmsgs)
+
+
+def print_throughput(logfiles: List[str], readBytes: int, seconds: float) -> None:
+    """Print how fast the logfiles were read (and decompressed)."""
+    megabytes = readBytes / 1024 / 1024
+    seconds = max(seconds, 0.001)
+    message = 'Read %.1f MB in %.1f s (%.1f MB/s)' % (megabytes, seconds, megabytes / seconds)
+
+    compressed = [logfile for logfile in logfiles
+                  if os.path.isfile(logfile) and get_compression(logfile) is not None]
+    if len(compressed) > 0:
+        compressedMegabytes = sum(os.path.getsize(logfile) for logfile in compressed) / 1024 / 1024
+        message += ', decompressed from %.1f MB (%.1f MB/s)' % (compressedMegabytes, compressedMegabytes / seconds)
+
+    print(message)
+
+
 def main(args: DefaultArgs):
     """Entry point of the application."""
+    if args.follow or args.listen is not None:
+        # mails have to be stored as soon as they are finished,
+        # as the parser does not stop on its own
+        args.streaming = True
+
     try:
         Config().setup(
             args.configfile,
@@ -63,9 +200,12 @@ def main(args: DefaultArgs):
         print_exception(e, "Trying to read the config", "Exiting application", fatal=True)
         sys.exit(8)
 
+    # the flags which were not given are taken from the config
+    for flag in ('bytesmode', 'mmap', 'streaming', 'merge', 'decompressprocess'):
+        setattr(args, flag, Config().get(flag) is True)
+
     try:
-        pluginManager = PluginManager(
-            absPluginsPath=os.path.join(BASEDIR, 'plugins-enabled'))
+        pluginManager = PluginManager(absPluginsPath=PLUGINSDIR)
     except Exception as e:
         print_exception(
             e,
@@ -77,16 +217,115 @@ def main(args: DefaultArgs):
     repository = RepositoryFactory.create_repository()
     currByte = repository.get_position_of_last_read_byte()
 
-    logfilehandle = open(args.logfile, 'r', errors='replace')
-    linecounter = 0
+    # restore the fragments of the unfinished mails of the last run
+    serializer = None
+    if Config().get('store_path') is not None:
+        try:
+            serializer = Serializer(Config())
+            serializer.restore(pluginManager.dataReceiver)
+        except FileNotFoundError as e:
+            # nothing was stored yet
+            pass
+        except Exception as e:
+            print_exception(
+                e,
+                "Trying to restore the unfinished mails of the last run",
+                "Exiting application",
+                fatal=True)
+            sys.exit(11)
+
+    # the saved position refers to the last (newest) logfile, it usually is a diff
+    # of the original logfile starting at the saved position, otherwise
+    # 'offset' is the position where it starts
+    logfiles = order_logfiles(args.logfiles if args.logfiles else [args.logfile])
+    startByte = currByte if args.offset is None else args.offset
+    lastFingerprint = repository.get_fingerprint_of_last_read_line()
+    lastSkip = currByte - startByte
+
+    # several logfiles without a 'resumefile' are processed manually (eg. older
+    # rotated logfiles), the last one is not necessarily the logfile of the regular runs
+    savePosition = len(logfiles) == 1 or args.resumefile is not None or args.follow or args.saveposition
+
+    if args.resumefile is not None and args.resumefile in logfiles[:-1]:
+        # the logfile was rotated since the last run, the rest of the rotated
+        # logfile is processed first and the new one is read from its beginning
+        startByte = 0
+        lastSkip = 0
+
+    newByte = currByte
+    newFingerprint = None
+    reader = None
+    readBytes = 0
+    startTime = time.time()
+
+    if args.bytesmode:
+        process_line = pluginManager.process_line_bytes
+    else:
+        process_line = lambda line: pluginManager.process_line(line.decode('utf-8', errors='replace'))
 
     try:
-        for line in logfilehandle:
-            pluginManager.process_line(line)
-            if args.printmsgs:
-                    linecounter += 1
-                    sys.stdout.write('\rProcessed %d lines' % linecounter)
-                    sys.stdout.flush()
+        if args.listen is not None:
+            # the messages are not read from a logfile, therefore no position is saved
+            listener = SyslogListener(
+                pluginManager,
+                args.followinterval,
+                args.bytesmode,
+                args.printmsgs,
+                args.listenqueue,
+                args.listenbatch)
+            listener.listen(args.listen)
+        elif args.merge:
+            # the logfiles are not parts of one logfile, therefore no position is saved
+            readers = [open_logfile(logfile, args) for logfile in logfiles]
+
+            try:
+                merger = TimestampMerger(readers, pluginManager.headerParser)
+                process_lines(merger, process_line, args.printmsgs)
+            finally:
+                for mergedReader in readers:
+                    mergedReader.close()
+
+            readBytes += sum(mergedReader.offset for mergedReader in readers)
+        else:
+            # the older logfiles are processed completely into the same
+            # containers, so that mails spanning a rotation are aggregated
+            for logfile in logfiles[:-1]:
+                olderSkip = currByte if logfile == args.resumefile else 0
+
+                olderReader = open_logfile(logfile, args)
+                parse_logfile(olderReader, args, pluginManager, process_line, olderSkip, lastFingerprint)
+                readBytes += olderReader.offset
+
+            if args.follow:
+                # the followed logfile is the logfile itself and not a diff,
+                # therefore the saved position is an offset in this logfile
+                follower = LogFollower(pluginManager, repository, args.followinterval, args.bytesmode, args.printmsgs)
+                newByte = follower.follow(logfiles[-1], startByte + lastSkip, lastFingerprint)
+                newFingerprint = follower.fingerprint
+            else:
+                if args.logstream is not None:
+                    reader = StreamReader(args.logstream, logfiles[-1])
+
+                    # the stream starts at 'startByte' and not at the beginning of the logfile
+                    if lastSkip > 0 and not reader.resume(lastSkip, lastFingerprint):
+                        reader.close()
+                        reader = None
+
+                        if args.logstreamfromstart is None:
+                            raise IOError('The last processed line was not found in %s, ' % logfiles[-1] +
+                                          'the bytes before position %d cannot be read' % startByte)
+
+                        print_warning('The last processed line was not found in the logfile, ' +
+                                      'reading the whole logfile.')
+                        reader = StreamReader(args.logstreamfromstart(), logfiles[-1])
+                        startByte = 0
+
+                    lastSkip = 0
+                else:
+                    reader = open_logfile(logfiles[-1], args)
+
+                # skip the lines which were already processed in the last run
+                parse_logfile(reader, args, pluginManager, process_line, lastSkip, lastFingerprint)
     except UnicodeDecodeError as e:
         print_exception(
             e,
@@ -100,13 +339,18 @@ def main(args: DefaultArgs):
             fatal=True)
         sys.exit(9)
 
+    # the exact position after the last processed line
+    # and its fingerprint for the next run
+    if reader is not None:
+        newByte = startByte + reader.offset
+        newFingerprint = reader.fingerprint
+        readBytes += reader.offset
+
     if args.printmsgs:
         print('')
 
-    # save the byte position for the next run
-    diffByte = os.fstat(logfilehandle.fileno()).st_size
-    newByte = max(0, currByte + diffByte - 1000)
-    repository.save_position_of_last_read_byte(newByte)
+        if not args.follow and args.listen is None:
+            print_throughput(logfiles, readBytes, time.time() - startTime)
 
     # aggregate fragments to objects
     for container in pluginManager.dataReceiver.containers:
@@ -120,16 +364,41 @@ def main(args: DefaultArgs):
                 fatal=True)
             sys.exit(10)
 
+    # store the fragments of the unfinished mails for the next run
+    if serializer is not None:
+        try:
+            serializer.store(pluginManager.dataReceiver)
+        except Exception as e:
+            print_exception(
+                e,
+                'Storing the unfinished mails',
+                'Exiting application',
+                fatal=True)
+            sys.exit(12)
+
+    # the position is saved last, so that the loglines are processed
+    # again in the next run if the aggregation or the store failed
+    if not savePosition:
+        if not args.merge:
+            print_warning('Several logfiles were processed, the position of the last read byte ' +
+                          'is not saved (use --save-position to save it).')
+    elif newFingerprint is not None:
+        repository.save_position_of_last_read_byte(newByte)
+        repository.save_fingerprint_of_last_read_line(newFingerprint)
+    elif newByte > currByte:
+        repository.save_position_of_last_read_byte(newByte)
+
         
 """We only start with the executation if we are the main."""
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(
         description="Tamandua parser aggregates from logfile data")
     parser.add_argument(
-        'logfile',
+        'logfiles',
         metavar='LOGFILE',
         type=str,
-        help='Logfile to be parsed')
+        nargs='*',
+        help='Logfiles (or glob patterns) to be parsed, they are processed in chronological order')
     parser.add_argument(
         '--config',
         '-c',
@@ -149,9 +418,98 @@ if __name__ == '__main__':
         default=False,
         action='store_true',
         help='Print system messages, eg.: currently processed loglines, number of processed objects')
+    parser.add_argument(
+        '--workers',
+        '-w',
+        dest='workers',
+        default=1,
+        type=int,
+        help='Number of processes which parse the logfile in parallel')
+    parser.add_argument(
+        '--bytes-mode',
+        dest='bytesmode',
+        default=None,
+        action='store_true',
+        help='Read the logfile undecoded and only decode loglines which are processed by a plugin')
+    parser.add_argument(
+        '--mmap',
+        dest='mmap',
+        default=None,
+        action='store_true',
+        help='Read the logfile using a memory map and save the exact position of the last processed line')
+    parser.add_argument(
+        '--streaming',
+        dest='streaming',
+        default=None,
+        action='store_true',
+        help='Aggregate and store mails as soon as they are finished instead of after parsing the whole logfile')
+    parser.add_argument(
+        '--streaming-window',
+        dest='streaming_window',
+        default=None,
+        type=int,
+        help='Number of loglines to wait for late fragments of a finished mail in streaming mode')
+    parser.add_argument(
+        '--follow',
+        '-f',
+        dest='follow',
+        default=False,
+        action='store_true',
+        help='Keep running and process loglines as they are appended to the logfile (implies --streaming)')
+    parser.add_argument(
+        '--merge',
+        dest='merge',
+        default=None,
+        action='store_true',
+        help='The logfiles are logs of different hosts, merge their loglines by timestamp (no position is saved)')
+    parser.add_argument(
+        '--decompress-process',
+        dest='decompressprocess',
+        default=None,
+        action='store_true',
+        help='Decompress a compressed logfile (gzip, bz2, xz) in a separate process')
+    parser.add_argument(
+        '--offset',
+        dest='offset',
+        default=None,
+        type=int,
+        help='Byte position in the original logfile where the last LOGFILE starts (default: the saved position)')
+    parser.add_argument(
+        '--save-position',
+        dest='saveposition',
+        default=False,
+        action='store_true',
+        help='Save the position in the last LOGFILE even if several logfiles are given')
+    parser.add_argument(
+        '--listen',
+        dest='listen',
+        default=None,
+        type=str,
+        help='Process syslog messages received on a local socket instead of a logfile: udp:HOST:PORT or unix:PATH')
+    parser.add_argument(
+        '--listen-queue',
+        dest='listenqueue',
+        default=1000,
+        type=int,
+        help='Maximal number of received batches waiting to be processed, further messages are dropped')
+    parser.add_argument(
+        '--listen-batch',
+        dest='listenbatch',
+        default=100,
+        type=int,
+        help='Maximal number of syslog messages per batch')
+    parser.add_argument(
+        '--follow-interval',
+        dest='followinterval',
+        default=10,
+        type=float,
+        help='Seconds between storing the finished mails (and the position) when following a logfile or listening')
 
     # https://docs.python.org/3/library/argparse.html#argparse.Namespace
     args = DefaultArgs()
     parser.parse_args(namespace=args)
 
+    if len(args.logfiles) == 0 and args.listen is None:
+        parser.error('the following arguments are required: LOGFILE')
+
     main(args)